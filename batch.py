@@ -0,0 +1,240 @@
+import numpy as np
+
+from constants import *
+from movegen import KNIGHT_OFFSETS, geometry
+from state import BoardState, WHITE, BLACK
+from weights import make_weights
+
+# Motor vectorizado con NumPy: N tableros independientes del mismo tamaño
+# apilados en arreglos.
+#   destroyed  (N, filas, cols) bool   casillas destruidas
+#   values     (N, filas, cols) int16  valor del elemento (0 si no hay)
+#   white      (N, 2) int             fila y columna del caballo blanco
+#   black      (N, 2) int             fila y columna del caballo negro
+#   scores     (N, 2) int             puntaje blanco y negro
+#   turn       (N,) int8              WHITE o BLACK
+# Los movimientos legales se calculan desplazando el plano de cada caballo con
+# los ocho offsets en forma de L, para los N tableros a la vez.
+
+
+def _mask_to_plane(mask, rows, cols):
+    data = mask.to_bytes((rows * cols + 7) // 8, 'little')
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder='little')
+    return bits[:rows * cols].reshape(rows, cols).astype(bool)
+
+
+def _plane_to_mask(plane):
+    bits = np.packbits(plane.reshape(-1).astype(np.uint8), bitorder='little')
+    return int.from_bytes(bits.tobytes(), 'little')
+
+
+def shift(planes, dr, dc):
+    # out[:, r + dr, c + dc] = planes[:, r, c], rellenando con False
+    out = np.zeros_like(planes)
+    rows, cols = planes.shape[1], planes.shape[2]
+    src_r = slice(max(0, -dr), rows - max(0, dr))
+    src_c = slice(max(0, -dc), cols - max(0, dc))
+    dst_r = slice(max(0, dr), rows - max(0, -dr))
+    dst_c = slice(max(0, dc), cols - max(0, -dc))
+    out[:, dst_r, dst_c] = planes[:, src_r, src_c]
+    return out
+
+
+def knight_targets(planes):
+    # Casillas alcanzables con un salto de caballo desde cualquier casilla marcada
+    out = np.zeros_like(planes)
+    for dr, dc in KNIGHT_OFFSETS:
+        out |= shift(planes, dr, dc)
+    return out
+
+
+class BoardBatch:
+    def __init__(self, destroyed, values, white, black, scores, turn):
+        self.destroyed = destroyed
+        self.values = values
+        self.white = white
+        self.black = black
+        self.scores = scores
+        self.turn = turn
+        self.geo = geometry(destroyed.shape[1], destroyed.shape[2])
+        # Penalización ya aplicada a cada caballo (como Game.game_over)
+        self.penalized = np.zeros((len(turn), 2), dtype=bool)
+
+    def __len__(self):
+        return len(self.turn)
+
+    # CONVERSIONES
+    @classmethod
+    def from_states(cls, states):
+        n = len(states)
+        geo = states[0].geo
+        shape = (n, geo.rows, geo.cols)
+        destroyed = np.zeros(shape, dtype=bool)
+        values = np.zeros(shape, dtype=np.int16)
+        white = np.zeros((n, 2), dtype=np.int64)
+        black = np.zeros((n, 2), dtype=np.int64)
+        scores = np.zeros((n, 2), dtype=np.int64)
+        turn = np.zeros(n, dtype=np.int8)
+
+        for i, state in enumerate(states):
+            if state.geo is not geo:
+                raise ValueError("all boards in a batch must have the same size")
+            destroyed[i] = _mask_to_plane(state.destroyed, geo.rows, geo.cols)
+            for value, mask in zip(TIER_VALUES, state.tiers):
+                if mask:
+                    values[i][_mask_to_plane(mask, geo.rows, geo.cols)] = value
+            white[i] = geo.row_col(state.white)
+            black[i] = geo.row_col(state.black)
+            scores[i] = (state.white_score, state.black_score)
+            turn[i] = state.turn
+        return cls(destroyed, values, white, black, scores, turn)
+
+    @classmethod
+    def from_games(cls, games):
+        return cls.from_states([BoardState.from_game(game) for game in games])
+
+    def to_states(self):
+        geo = self.geo
+        states = []
+        for i in range(len(self)):
+            tiers = [_plane_to_mask(self.values[i] == value) for value in TIER_VALUES]
+            states.append(BoardState(
+                _plane_to_mask(self.destroyed[i]), tiers,
+                geo.square(*map(int, self.white[i])), geo.square(*map(int, self.black[i])),
+                int(self.scores[i, 0]), int(self.scores[i, 1]), int(self.turn[i]), geo))
+        return states
+
+    # MOVIMIENTOS
+    def horse_planes(self, positions):
+        planes = np.zeros(self.destroyed.shape, dtype=bool)
+        planes[np.arange(len(self)), positions[:, 0], positions[:, 1]] = True
+        return planes
+
+    def blocked(self):
+        return self.destroyed | self.horse_planes(self.white) | self.horse_planes(self.black)
+
+    def legal_masks(self):
+        # Movimientos legales de ambos caballos: (N, filas, cols) cada uno
+        blocked = self.blocked()
+        white_moves = knight_targets(self.horse_planes(self.white)) & ~blocked
+        black_moves = knight_targets(self.horse_planes(self.black)) & ~blocked
+        return white_moves, black_moves
+
+    def mobility(self):
+        white_moves, black_moves = self.legal_masks()
+        return white_moves.sum(axis=(1, 2)), black_moves.sum(axis=(1, 2))
+
+    def evaluate(self, weights=None):
+        # Misma heurística que Game.evaluate_board para los N tableros, con los
+        # mismos pesos (diccionario de weights.py; None usa los por defecto)
+        weights = make_weights(weights)
+        white_mobility, black_mobility = self.mobility()
+        score_diff = self.scores[:, 0] - self.scores[:, 1]
+        return score_diff * weights['score'] + (white_mobility - black_mobility) * weights['mobility']
+
+    # PARTIDAS EN PARALELO
+    def step(self, rng, policy='random'):
+        # Avanza un turno en todas las partidas no terminadas con las reglas de
+        # GUI.run. Devuelve el arreglo de partidas que siguen activas.
+        white_moves, black_moves = self.legal_masks()
+        white_count = white_moves.sum(axis=(1, 2))
+        black_count = black_moves.sum(axis=(1, 2))
+        active = (white_count > 0) | (black_count > 0)
+
+        # Penalización única para el caballo que se queda sin movimientos
+        for side, count in ((WHITE, white_count), (BLACK, black_count)):
+            stuck = active & (count == 0) & ~self.penalized[:, side]
+            self.scores[stuck, side] -= PASS_PENALTY
+            self.penalized[stuck, side] = True
+
+        is_white = self.turn == WHITE
+        moves = np.where(is_white[:, None, None], white_moves, black_moves)
+        can_move = active & moves.any(axis=(1, 2))
+
+        # Elección: al azar o la casilla de mayor valor (desempate al azar)
+        noise = rng.random(moves.shape)
+        if policy == 'greedy':
+            noise = noise + self.values * 2
+        choice = np.where(moves, noise, -np.inf).reshape(len(self), -1).argmax(axis=1)
+        rows, cols = np.divmod(choice, self.geo.cols)
+
+        idx = np.nonzero(can_move)[0]
+        if len(idx):
+            r, c = rows[idx], cols[idx]
+            movers = is_white[idx]
+            old = np.where(movers[:, None], self.white[idx], self.black[idx])
+            self.destroyed[idx, old[:, 0], old[:, 1]] = True
+            side = np.where(movers, WHITE, BLACK)
+            self.scores[idx, side] += self.values[idx, r, c]
+            self.values[idx, r, c] = 0
+            new = np.stack([r, c], axis=1)
+            self.white[idx[movers]] = new[movers]
+            self.black[idx[~movers]] = new[~movers]
+
+        # El turno pasa también cuando el caballo en turno no puede mover
+        self.turn[active] ^= 1
+        return active
+
+    def play_out(self, rng, policy='random', max_steps=None):
+        # Juega todas las partidas hasta el final; devuelve los puntajes finales
+        # (ninguna partida dura más de dos plies por casilla)
+        if max_steps is None:
+            max_steps = 4 * self.geo.size
+        for _ in range(max_steps):
+            if not self.step(rng, policy).any():
+                break
+        return self.scores.copy()
+
+
+def evaluate_states(states, weights=None):
+    # Evaluación por lotes de una lista de BoardState
+    return BoardBatch.from_states(states).evaluate(weights)
+
+
+def check_batch(count=300, seed=0, rows=ROWS, cols=COLS):
+    # Prueba de consistencia: la evaluación por lotes coincide con
+    # Game.evaluate_board y las partidas en paralelo solo hacen jugadas legales
+    import random
+    from game import Game
+
+    rng = random.Random(seed)
+    states = []
+    for i in range(count):
+        state = BoardState.from_game(Game(seed=i, rows=rows, cols=cols))
+        for _ in range(rng.randrange(40)):
+            moves = state.legal_moves(state.turn)
+            if not moves and not state.legal_moves(state.turn ^ 1):
+                break
+            state.make_move(rng.choice(moves) if moves else -1)
+        states.append(state)
+
+    for weights in (None, {'score': 1.5, 'mobility': 0.375}):
+        engine = Game(weights=weights)
+        expected = [engine.evaluate_board(state) for state in states]
+        assert evaluate_states(states, weights).tolist() == expected, "evaluación por lotes incorrecta"
+
+    batch = BoardBatch.from_states(states)
+    assert [s.key() for s in batch.to_states()] == [s.key() for s in states], "conversión incorrecta"
+
+    np_rng = np.random.default_rng(seed)
+    while True:
+        before = batch.to_states()
+        active = batch.step(np_rng, policy='greedy' if rng.random() < 0.5 else 'random')
+        if not active.any():
+            break
+        for i, (old, new) in enumerate(zip(before, batch.to_states())):
+            if not active[i]:
+                assert new.key() == old.key(), "una partida terminada cambió"
+                continue
+            side = old.turn
+            moves = old.legal_moves(side)
+            position = new.white if side == WHITE else new.black
+            assert (position in moves) if moves else (position == (old.white if side == WHITE else old.black))
+            assert new.turn == side ^ 1
+    return True
+
+
+if __name__ == "__main__":
+    check_batch()
+    check_batch(count=40, rows=12, cols=12)
+    print("batch OK")
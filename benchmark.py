@@ -0,0 +1,242 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+from game import Game
+from state import BoardState, PASS
+
+# Banco de pruebas reproducible del motor.
+# Usa un corpus fijo de tableros con semilla (Game._init_board) en tres fases:
+# apertura, medio juego y final. Mide tiempo por jugada y nodos por segundo a
+# las profundidades de la GUI (2/4/6) y un conteo perft para verificar que la
+# generación de movimientos no cambió.
+#
+#   python benchmark.py --out bench.json
+#   python benchmark.py --baseline bench_baseline.json --threshold 10
+#   python benchmark.py --sizes 8,12,16,32      (nodos por segundo según el tamaño)
+
+DEPTHS = (2, 4, 6)
+PERFT_DEPTH = 4
+# Fase -> plies aleatorios jugados desde el tablero inicial
+PHASES = {'opening': 0, 'midgame': 14, 'endgame': 30}
+CORPUS_SEEDS = range(16)
+# Escalado con el tamaño del tablero: lados, profundidad y tableros por tamaño
+SIZES = (8, 12, 16, 32)
+SIZE_DEPTH = 4
+SIZE_SEEDS = range(4)
+
+
+def build_corpus(seeds=CORPUS_SEEDS, phases=PHASES, rows=8, cols=8):
+    corpus = []
+    for seed in seeds:
+        for phase, plies in phases.items():
+            game = Game(seed=seed, rows=rows, cols=cols)
+            rng = random.Random(seed)
+            state = BoardState.from_game(game)
+            for _ in range(plies):
+                moves = state.legal_moves(state.turn)
+                if not moves:
+                    if not state.legal_moves(state.turn ^ 1):
+                        break
+                    state.make_move(PASS)
+                    continue
+                state.make_move(rng.choice(moves))
+            # Solo posiciones donde el caballo en turno puede mover
+            if not state.legal_moves(state.turn):
+                continue
+            corpus.append({'name': f"{phase}-{seed}", 'phase': phase, 'state': state})
+    return corpus
+
+
+def perft(state, depth):
+    # Número de hojas del árbol de juego con las reglas de la búsqueda
+    # (paso con penalización si solo el rival puede mover)
+    if depth == 0:
+        return 1
+    moves = state.legal_moves(state.turn)
+    if not moves:
+        if not state.legal_moves(state.turn ^ 1):
+            return 1
+        moves = [PASS]
+    total = 0
+    for move in moves:
+        token = state.make_move(move)
+        total += perft(state, depth - 1)
+        state.unmake_move(token)
+    return total
+
+
+def time_search(state, depth, repeat):
+    # Mediana de varias búsquedas con un motor nuevo cada vez (sin tabla previa)
+    times = []
+    nodes = 0
+    move = None
+    for _ in range(repeat):
+        searcher = Game(difficulty=depth)
+        start = time.perf_counter()
+        move = searcher.search(state)
+        times.append(time.perf_counter() - start)
+        nodes = searcher.nodes
+    elapsed = statistics.median(times)
+    return {
+        'ms': round(elapsed * 1000, 3),
+        'nodes': nodes,
+        'nps': round(nodes / elapsed) if elapsed > 0 else 0,
+        'move': move,
+    }
+
+
+def run(depths=DEPTHS, perft_depth=PERFT_DEPTH, repeat=3):
+    positions = []
+    for entry in build_corpus():
+        state = entry['state']
+        result = {
+            'name': entry['name'],
+            'phase': entry['phase'],
+            'perft': perft(state.copy(), perft_depth),
+            'search': {},
+        }
+        for depth in depths:
+            result['search'][str(depth)] = time_search(state, depth, repeat)
+        positions.append(result)
+
+    summary = {}
+    for depth in depths:
+        key = str(depth)
+        total_ms = sum(p['search'][key]['ms'] for p in positions)
+        total_nodes = sum(p['search'][key]['nodes'] for p in positions)
+        summary[key] = {
+            'total_ms': round(total_ms, 3),
+            'max_ms': max(p['search'][key]['ms'] for p in positions),
+            'nodes': total_nodes,
+            'nps': round(total_nodes / (total_ms / 1000)) if total_ms > 0 else 0,
+        }
+    summary['perft'] = sum(p['perft'] for p in positions)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'perft_depth': perft_depth,
+            'repeat': repeat,
+        },
+        'summary': summary,
+        'positions': positions,
+    }
+
+
+def size_scaling(sizes=SIZES, depth=SIZE_DEPTH, seeds=SIZE_SEEDS, repeat=1):
+    # Tiempo y nodos por segundo de la búsqueda en tableros n x n (con los
+    # elementos escalados al área, ver game.default_items)
+    results = {}
+    for n in sizes:
+        total_ms = 0.0
+        total_nodes = 0
+        corpus = build_corpus(seeds, {'opening': 0, 'midgame': 14}, rows=n, cols=n)
+        for entry in corpus:
+            result = time_search(entry['state'], depth, repeat)
+            total_ms += result['ms']
+            total_nodes += result['nodes']
+        results[str(n)] = {
+            'positions': len(corpus),
+            'ms_per_move': round(total_ms / len(corpus), 3) if corpus else 0.0,
+            'nodes': total_nodes,
+            'nps': round(total_nodes / (total_ms / 1000)) if total_ms > 0 else 0,
+        }
+    return results
+
+
+def size_report(sizes, depth):
+    lines = [f"{'board':>7} {'positions':>9} {'ms/move':>9} {'nodes':>9} {'nodes/s':>9}   (depth {depth})"]
+    for n, s in sizes.items():
+        lines.append(f"{n + 'x' + n:>7} {s['positions']:>9} {s['ms_per_move']:>9.1f} {s['nodes']:>9} {s['nps']:>9}")
+    return '\n'.join(lines)
+
+
+def compare(current, baseline, threshold):
+    # Devuelve la lista de regresiones frente a la línea base
+    problems = []
+    if current['summary']['perft'] != baseline['summary']['perft']:
+        problems.append(f"perft changed: {baseline['summary']['perft']} -> {current['summary']['perft']}")
+
+    base_moves = {p['name']: p for p in baseline['positions']}
+    for position in current['positions']:
+        old = base_moves.get(position['name'])
+        if old is None:
+            continue
+        for depth, result in position['search'].items():
+            if depth in old['search'] and old['search'][depth]['move'] != result['move']:
+                problems.append(f"{position['name']} depth {depth}: best move "
+                                f"{old['search'][depth]['move']} -> {result['move']}")
+
+    for depth, result in current['summary'].items():
+        if depth == 'perft' or depth not in baseline['summary']:
+            continue
+        old = baseline['summary'][depth]
+        if old['total_ms'] > 0:
+            change = (result['total_ms'] - old['total_ms']) / old['total_ms'] * 100
+            if change > threshold:
+                problems.append(f"depth {depth}: time-to-move {old['total_ms']:.1f} ms -> "
+                                f"{result['total_ms']:.1f} ms (+{change:.1f}%)")
+    return problems
+
+
+def report(results, baseline=None):
+    lines = [f"{'depth':>5} {'total ms':>10} {'max ms':>9} {'nodes':>10} {'nodes/s':>10}"]
+    for depth, s in results['summary'].items():
+        if depth == 'perft':
+            continue
+        line = f"{depth:>5} {s['total_ms']:>10.1f} {s['max_ms']:>9.1f} {s['nodes']:>10} {s['nps']:>10}"
+        if baseline is not None and depth in baseline['summary']:
+            old = baseline['summary'][depth]['total_ms']
+            if old > 0:
+                line += f"   ({(s['total_ms'] - old) / old * 100:+.1f}% vs baseline)"
+        lines.append(line)
+    lines.append(f"perft({results['meta']['perft_depth']}) total: {results['summary']['perft']}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Smart Horses engine benchmark")
+    parser.add_argument('--out', help="write results as JSON")
+    parser.add_argument('--baseline', help="compare against a stored JSON result")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="allowed time-to-move regression in percent (default 10)")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per position (median)")
+    parser.add_argument('--depths', default=','.join(map(str, DEPTHS)), help="comma separated depths")
+    parser.add_argument('--sizes', help="also measure n x n boards, e.g. 8,12,16,32")
+    args = parser.parse_args(argv)
+
+    depths = tuple(int(d) for d in args.depths.split(','))
+    results = run(depths=depths, repeat=args.repeat)
+    if args.sizes:
+        results['sizes'] = size_scaling(tuple(int(n) for n in args.sizes.split(',')))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(report(results, baseline))
+    if 'sizes' in results:
+        print(size_report(results['sizes'], SIZE_DEPTH))
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=1)
+
+    if baseline is not None:
+        problems = compare(results, baseline, args.threshold)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
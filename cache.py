@@ -0,0 +1,229 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+
+from state import BoardState, MASK64, BLACK
+
+# Caché persistente de posiciones buscadas (sobre todo las primeras jugadas,
+# que son las más caras porque el tablero está abierto).
+# Archivo binario de tamaño fijo que se abre con mmap: abrirlo no lee nada y
+# cada consulta toca solo las cubetas que necesita.
+#
+#   cabecera:  magic, versión, número de cubetas (potencia de dos), último sello
+#   cubeta:    clave u64, valor f32, movimiento i16, profundidad u8, sello u32
+#
+# La clave mezcla el hash Zobrist (fijo entre ejecuciones) con la profundidad
+# pedida, así cada nivel de dificultad guarda y recupera su propia jugada.
+# Direccionamiento abierto con sondeo lineal en una ventana de PROBE cubetas;
+# si la ventana está llena se reemplaza la entrada menos profunda y más vieja.
+#
+#   python cache.py --seeds 0:500 --depths 4,6        (precálculo offline)
+
+MAGIC = b'SHPC'
+VERSION = 1
+HEADER = struct.Struct('<4sHxxII')
+RECORD = struct.Struct('<QfhBxI')
+PROBE = 8
+
+
+def user_cache_dir():
+    # Directorio de caché del usuario (XDG), fuera del árbol de fuentes
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'smart_horses')
+
+
+DEFAULT_PATH = os.path.join(user_cache_dir(), 'positions.cache')
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+
+def cache_key(zobrist, depth):
+    key = (zobrist + depth * 0x9E3779B97F4A7C15) & MASK64
+    # 0 marca una cubeta vacía
+    return key or 1
+
+
+class PositionCache:
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        self.mm = None
+        self.file = None
+        self.size = 0
+        # Resultados nuevos aún no escritos en el archivo: clave -> (movimiento, valor, profundidad)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.saver = None
+        self.stamp = 0
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.exists(path):
+            if readonly:
+                return
+            buckets = max(PROBE, (max_bytes - HEADER.size) // RECORD.size)
+            size = 1 << (buckets.bit_length() - 1)
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # Se crea con otro nombre: si el proceso muere a medias no queda
+            # un archivo corto con el nombre de la caché
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, size, 0))
+                f.truncate(HEADER.size + size * RECORD.size)
+            os.replace(tmp, path)
+
+        self.file = open(path, 'rb' if readonly else 'r+b')
+        length = os.fstat(self.file.fileno()).st_size
+        if length < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a position cache (version {VERSION})")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE)
+        magic, version, size, stamp = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a position cache (version {VERSION})")
+        # Un archivo truncado fallaría más tarde, en una consulta desde el hilo de la IA
+        if size <= 0 or size & (size - 1) or length != HEADER.size + size * RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is damaged ({length} bytes for {size} buckets)")
+        self.size = size
+        self.mask = size - 1
+        # El sello crece con cada escritura; sirve para desalojar lo más viejo
+        self.stamp = stamp
+
+    def _offset(self, index):
+        return HEADER.size + index * RECORD.size
+
+    def lookup(self, zobrist, depth):
+        # (movimiento, valor) guardado para la posición a esa profundidad, o None
+        key = cache_key(zobrist, depth)
+        with self.lock:
+            entry = self.pending.get(key)
+            if entry is None and self.mm is not None:
+                for i in range(PROBE):
+                    stored, value, move, stored_depth, _ = RECORD.unpack_from(
+                        self.mm, self._offset((key + i) & self.mask))
+                    if stored == key and stored_depth == depth:
+                        entry = (move, value)
+                        break
+                    if stored == 0:
+                        break
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def record(self, zobrist, depth, move, value):
+        # Se guarda en memoria; save() o save_async() lo escriben en el archivo
+        if self.readonly:
+            return
+        with self.lock:
+            self.pending[cache_key(zobrist, depth)] = (move, value, depth)
+
+    def _write(self, key, move, value, depth):
+        victim = None
+        victim_rank = None
+        for i in range(PROBE):
+            index = (key + i) & self.mask
+            stored, _, _, stored_depth, stamp = RECORD.unpack_from(self.mm, self._offset(index))
+            if stored == key or stored == 0:
+                victim = index
+                break
+            if victim_rank is None or (stored_depth, stamp) < victim_rank:
+                victim = index
+                victim_rank = (stored_depth, stamp)
+        self.stamp += 1
+        RECORD.pack_into(self.mm, self._offset(victim), key, value, move, depth, self.stamp)
+
+    def save(self):
+        if self.mm is None or self.readonly:
+            return 0
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+            for key, (move, value, depth) in pending.items():
+                self._write(key, move, value, depth)
+            HEADER.pack_into(self.mm, 0, MAGIC, VERSION, self.size, self.stamp)
+        self.mm.flush()
+        return len(pending)
+
+    def save_async(self):
+        # Escribe en segundo plano (p. ej. al terminar una partida en la GUI)
+        if self.saver is not None and self.saver.is_alive():
+            return
+        self.saver = threading.Thread(target=self.save, daemon=True)
+        self.saver.start()
+
+    def close(self):
+        if self.saver is not None:
+            self.saver.join()
+        self.save()
+        with self.lock:
+            if self.mm is not None:
+                self.mm.close()
+                self.mm = None
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def __len__(self):
+        if self.mm is None:
+            return 0
+        return sum(1 for i in range(self.size) if RECORD.unpack_from(self.mm, self._offset(i))[0])
+
+
+def precompute(cache, seeds, depths, plies=1, log=print):
+    # Busca las primeras `plies` jugadas de la IA (blancas) en los tableros con
+    # semilla; tras cada jugada de la IA se prueban todas las respuestas del rival
+    from game import Game
+
+    for depth in depths:
+        searcher = Game(difficulty=depth, cache=cache)
+        positions = [BoardState.from_game(Game(seed=seed)) for seed in seeds]
+        for ply in range(plies):
+            replies = []
+            for state in positions:
+                move = searcher.search(state)
+                if move is None or ply == plies - 1:
+                    continue
+                child = state.copy()
+                child.make_move(move)
+                for reply in child.legal_moves(BLACK):
+                    grandchild = child.copy()
+                    grandchild.make_move(reply)
+                    if grandchild.legal_moves(grandchild.turn):
+                        replies.append(grandchild)
+            log(f"depth {depth} ply {ply + 1}: {len(positions)} positions")
+            positions = replies
+        cache.save()
+
+
+def parse_seeds(text):
+    start, _, stop = text.partition(':')
+    return range(int(start), int(stop)) if stop else [int(start)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the persistent first-move cache")
+    parser.add_argument('--path', default=DEFAULT_PATH, help=f"cache file (default {DEFAULT_PATH})")
+    parser.add_argument('--seeds', default='0:100', help="board seeds as START:STOP or a single seed")
+    parser.add_argument('--depths', default='4,6', help="comma separated search depths")
+    parser.add_argument('--plies', type=int, default=1, help="AI moves per game to precompute")
+    parser.add_argument('--max-mb', type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help="size cap used when creating the file")
+    args = parser.parse_args(argv)
+
+    cache = PositionCache(args.path, max_bytes=int(args.max_mb * 1024 * 1024))
+    try:
+        precompute(cache, parse_seeds(args.seeds), [int(d) for d in args.depths.split(',')], args.plies)
+        print(f"{len(cache)} positions in {args.path} ({cache.size} slots)")
+    finally:
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
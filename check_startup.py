@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+# Comprueba que el motor se importa sin pygame y mide el tiempo de arranque
+# con "python -X importtime". Sale con código 1 si el motor arrastra pygame.
+#
+#   python check_startup.py
+
+ENGINE_MODULES = ['game', 'simulate', 'parallel', 'server', 'tune']
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_time_us(module):
+    # Tiempo acumulado de importación (microsegundos) según -X importtime
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BASE_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    total = 0
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            total = int(parts[1])
+    return total
+
+
+def loads_pygame(module):
+    code = f"import sys, {module}; print('pygame' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR,
+                            capture_output=True, text=True)
+    return result.stdout.strip() == 'True'
+
+
+def main():
+    ok = True
+    for module in ENGINE_MODULES:
+        us = import_time_us(module)
+        pygame_loaded = loads_pygame(module)
+        ok = ok and not pygame_loaded and us is not None
+        status = 'FAIL (imports pygame)' if pygame_loaded else 'ok'
+        timing = f"{us / 1000:8.1f} ms" if us is not None else "  import failed"
+        print(f"{module:<10} {timing}  {status}")
+
+    # Referencia: lo que costaba antes, cuando settings.py importaba pygame
+    pygame_us = import_time_us('pygame')
+    if pygame_us is not None:
+        print(f"{'pygame':<10} {pygame_us / 1000:8.1f} ms  (now only loaded by main.py)")
+    else:
+        print("pygame     not installed (the engine does not need it)")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
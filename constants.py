@@ -0,0 +1,17 @@
+# Constantes del motor del juego (sin dependencias de pygame).
+# Las constantes de dibujo están en settings.py.
+
+# Dimensiones del Tablero
+ROWS = 8
+COLS = 8
+
+# Código de casilla destruida en Game.board
+DESTROYED = -20
+
+# Elementos con puntos que se colocan al iniciar la partida (en este orden)
+BOARD_ITEMS = [-1, -3, -4, -5, -10, 1, 3, 4, 5, 10]
+# Niveles de valor distintos, de menor a mayor
+TIER_VALUES = tuple(sorted(set(BOARD_ITEMS)))
+
+# Penalización del caballo que se queda sin movimientos
+PASS_PENALTY = 4
@@ -0,0 +1,157 @@
+from constants import *
+from movegen import squares_of
+from state import WHITE, PASS
+
+# Solucionador exacto de finales.
+# Cuando las casillas alcanzables por los caballos son pocas, se juega hasta el
+# final con las reglas de GUI.run: la penalización de Game.game_over se aplica
+# una sola vez por caballo, el caballo sin jugadas cede el turno y la partida
+# acaba cuando ninguno puede mover. Los resultados se memorizan por
+# (posiciones, casillas destruidas, turno, penalizaciones aplicadas).
+
+# Por debajo de este número de casillas alcanzables se resuelve el final
+ENDGAME_SQUARES = 20
+
+
+def reachable(sq, free, masks):
+    # Casillas libres alcanzables desde sq con saltos de caballo (relleno por
+    # inundación); masks son las de la Geometry del tablero
+    seen = 0
+    frontier = masks[sq] & free
+    while frontier:
+        seen |= frontier
+        step = 0
+        for s in squares_of(frontier):
+            step |= masks[s]
+        frontier = step & free & ~seen
+    return seen
+
+
+def reachable_region(state):
+    geo = state.geo
+    free = ~state.blocked() & geo.full
+    return reachable(state.white, free, geo.masks) | reachable(state.black, free, geo.masks)
+
+
+class EndgameSolver:
+    def __init__(self, max_squares=ENDGAME_SQUARES):
+        self.max_squares = max_squares
+        # (blanco, negro, destruidas, turno, penalizaciones) -> (margen futuro, mejor movimiento)
+        self.memo = {}
+        # Elementos del último tablero resuelto; la memoria solo sirve en la misma partida
+        self.tiers = None
+        self.nodes = 0
+
+    def applies(self, state):
+        return reachable_region(state).bit_count() <= self.max_squares
+
+    def _same_game(self, state):
+        # Un tablero sigue la misma partida si solo le faltan elementos en casillas ya bloqueadas
+        if self.tiers is None:
+            return False
+        blocked = state.blocked()
+        for old, new in zip(self.tiers, state.tiers):
+            if new & ~old or old & ~new & ~blocked:
+                return False
+        return True
+
+    def solve(self, state, penalized=None):
+        # Devuelve (margen final blanco - negro, mejor movimiento) con juego perfecto.
+        # penalized: penalizaciones ya cobradas (blanco, negro); por defecto las de
+        # un caballo que ya no puede mover, como tras llamar a Game.game_over
+        if not self._same_game(state):
+            self.memo.clear()
+        self.tiers = list(state.tiers)
+        self.nodes = 0
+
+        if penalized is None:
+            penalized = (state.white_mobility == 0, state.black_mobility == 0)
+        state = state.copy()
+        value, move = self._solve(state, penalized[0], penalized[1])
+        return state.white_score - state.black_score + value, move
+
+    def _solve(self, state, white_penalized, black_penalized):
+        self.nodes += 1
+        key = (state.white, state.black, state.destroyed, state.turn, white_penalized, black_penalized)
+        entry = self.memo.get(key)
+        if entry is not None:
+            return entry
+
+        side = state.turn
+        moves = state.legal_moves(side)
+        if not moves:
+            # Paso: el turno cambia sin coste extra, la penalización ya se cobró
+            state.turn = side ^ 1
+            value = self._after_check(state, white_penalized, black_penalized)
+            state.turn = side
+            result = (value, PASS)
+        else:
+            best_value = None
+            best_move = None
+            for move in moves:
+                margin = state.white_score - state.black_score
+                token = state.make_move(move)
+                value = state.white_score - state.black_score - margin
+                value += self._after_check(state, white_penalized, black_penalized)
+                state.unmake_move(token)
+                if best_value is None or (value > best_value if side == WHITE else value < best_value):
+                    best_value = value
+                    best_move = move
+            result = (best_value, best_move)
+
+        self.memo[key] = result
+        return result
+
+    def _after_check(self, state, white_penalized, black_penalized):
+        # Equivalente a Game.game_over tras cada jugada: fin de partida o penalización única
+        white_stuck = state.white_mobility == 0
+        black_stuck = state.black_mobility == 0
+        if white_stuck and black_stuck:
+            return 0
+        value = 0
+        if white_stuck and not white_penalized:
+            white_penalized = True
+            value -= PASS_PENALTY
+        if black_stuck and not black_penalized:
+            black_penalized = True
+            value += PASS_PENALTY
+        return value + self._solve(state, white_penalized, black_penalized)[0]
+
+
+def check_endgame(games=40, seed=0):
+    # Prueba: el margen del solucionador coincide con jugar la partida real
+    # (Game.move/game_over) siguiendo sus mejores movimientos
+    import random
+    from game import Game
+    from state import BoardState
+
+    rng = random.Random(seed)
+    solver = EndgameSolver()
+    solved = 0
+    for i in range(games):
+        game = Game(seed=i)
+        predicted = None
+        while not game.game_over():
+            if not game.get_valid_moves():
+                game.pass_turn()
+                continue
+            state = BoardState.from_game(game)
+            if predicted is not None or solver.applies(state):
+                # Las penalizaciones por defecto son las que ya cobró game_over
+                assert (state.white_mobility == 0, state.black_mobility == 0) == (
+                    game.white_horse_penality, game.black_horse_penality)
+                margin, move = solver.solve(state)
+                if predicted is None:
+                    predicted = margin
+                assert margin == predicted, "el margen cambia a lo largo de la variación principal"
+            else:
+                move = rng.choice(state.legal_moves(state.turn))
+            game.move(game.geo.row_col(move))
+        if predicted is not None:
+            solved += 1
+            assert game.white_horse.score - game.black_horse.score == predicted, "margen final incorrecto"
+    return solved
+
+
+if __name__ == "__main__":
+    print(f"endgame OK ({check_endgame()} games solved)")
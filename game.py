@@ -1,6 +1,31 @@
+import math
 import random
-from settings import *
-import copy
+import time
+from constants import *
+from movegen import geometry, KNIGHT_OFFSETS
+from state import BoardState, WHITE, BLACK, PASS
+from tt import TranspositionTable, DEFAULT_MAX_BYTES, EXACT, LOWER, UPPER
+from parallel import parallel_search
+from stats import SearchStats
+from endgame import EndgameSolver, ENDGAME_SQUARES
+from weights import DEFAULT_WEIGHTS, make_weights, load_weights
+
+# Límite de profundidad para el modo por tiempo (profundización iterativa)
+MAX_SEARCH_DEPTH = 64
+# Cada cuántos nodos se consulta el reloj durante la búsqueda
+TIME_CHECK_NODES = 1024
+# Byte de paso en move_log (más el bando); las jugadas son bando << 3 | offset
+PASS_BYTE = 0x80
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def default_items(rows, cols):
+    # Los elementos del tablero de 8x8, repetidos en proporción al área del tablero
+    return BOARD_ITEMS * max(1, round(rows * cols / (ROWS * COLS)))
+
 
 class Horse:
     def __init__(self, name):
@@ -18,8 +43,30 @@ class Horse:
 
 
 class Game:
-    def __init__(self, difficulty=4):
+    def __init__(self, difficulty=4, tt_max_bytes=DEFAULT_MAX_BYTES, time_budget_ms=None, workers=1, seed=None,
+                 collect_stats=False, endgame_squares=ENDGAME_SQUARES, cache=None,
+                 rows=ROWS, cols=COLS, items=None, engine='minimax', mcts_iterations=None, weights=None):
+        # Tamaño del tablero y elementos a repartir (valores de TIER_VALUES);
+        # por defecto los de 8x8 en proporción al área
+        self.rows = rows
+        self.cols = cols
+        self.geo = geometry(rows, cols)
+        self.items = list(items) if items is not None else default_items(rows, cols)
+        if any(item not in TIER_VALUES for item in self.items):
+            raise ValueError(f"item values must be in {TIER_VALUES}")
+        if len(self.items) + 2 > rows * cols:
+            raise ValueError(f"{len(self.items)} items and two horses do not fit on {rows}x{cols}")
+
+        # Con time_budget_ms la IA usa profundización iterativa y difficulty
+        # pasa a ser la profundidad máxima
         self.difficulty = difficulty
+        self.time_budget_ms = time_budget_ms
+        # Con más de un worker la búsqueda a profundidad fija reparte los
+        # movimientos de la raíz entre procesos (ver parallel.py)
+        self.workers = workers
+        # Con seed el tablero inicial es reproducible; sin ella se usa el módulo random
+        self.seed = seed
+        self.rng = random if seed is None else random.Random(seed)
         self.board = self._init_board()
         self.white_horse = Horse('WH')
         self.black_horse = Horse('BH')
@@ -29,19 +76,57 @@ class Game:
 
         self.white_horse_penality = False
         self.black_horse_penality = False
+
+        # Registro de la partida: tablero inicial y un byte por jugada o paso
+        # (formato en records.py)
+        self.initial_board = [row[:] for row in self.board]
+        self.move_log = bytearray()
+
+        # Tablas de ordenamiento de movimientos para la búsqueda
+        self.killers = []
+        self.history = [[0] * self.geo.size, [0] * self.geo.size]
+        # Tabla de transposiciones; se conserva entre turnos de la misma partida
+        self.tt = TranspositionTable(tt_max_bytes)
+        # Variación principal de la iteración anterior: hash -> movimiento
+        self.pv_moves = {}
+        self.nodes = 0
+        self.deadline = None
+        # Permite interrumpir la búsqueda desde otro hilo (ver worker.AIWorker)
+        self.stop_requested = False
+        # Estadísticas de la búsqueda en curso y de la última terminada
+        self.collect_stats = collect_stats
+        self.stats = None
+        self.last_stats = None
+        # Solucionador exacto para finales con pocas casillas alcanzables
+        # (endgame_squares=0 lo desactiva); su memoria dura toda la partida
+        self.endgame = EndgameSolver(endgame_squares) if endgame_squares else None
+        # Caché persistente de posiciones (cache.PositionCache); solo para la
+        # búsqueda a profundidad fija, cuyo resultado no depende del reloj
+        self.cache = cache
+        # Pesos de evaluate_board: diccionario o ruta de un archivo de pesos (ver weights.py)
+        self.set_weights(load_weights(weights) if isinstance(weights, str) else weights)
+        # Motor de la IA: 'minimax' o 'mcts' (mcts.MCTS, limitado por
+        # mcts_iterations partidas simuladas o por time_budget_ms)
+        if engine not in ('minimax', 'mcts'):
+            raise ValueError(f"Unknown engine: {engine!r} (use 'minimax' or 'mcts')")
+        self.engine = engine
+        self.mcts = None
+        if engine == 'mcts':
+            from mcts import MCTS, MCTS_ITERATIONS
+            self.mcts = MCTS(mcts_iterations or MCTS_ITERATIONS, seed=seed)
         
         
         
     # INICIO
     def _init_board(self):
-        board = [[0 for _ in range(COLS)] for _ in range(ROWS)]
-        elements_to_place = [-1, -3, -4, -5, -10, 1, 3, 4, 5, 10, 'WH', 'BH']
+        board = [[0 for _ in range(self.cols)] for _ in range(self.rows)]
+        elements_to_place = self.items + ['WH', 'BH']
         
         # Generar todas las posiciones posibles
-        all_positions = [(x, y) for x in range(ROWS) for y in range(COLS)]
+        all_positions = [(x, y) for x in range(self.rows) for y in range(self.cols)]
 
         # Seleccionar aleatoriamente posiciones únicas para los elementos
-        random_positions = random.sample(all_positions, len(elements_to_place))
+        random_positions = self.rng.sample(all_positions, len(elements_to_place))
         
         for i, element in enumerate(elements_to_place):
             row, col = random_positions[i]
@@ -52,8 +137,8 @@ class Game:
 
 
     def set_horse_position(self):
-        for r in range(ROWS):
-            for c in range(COLS):
+        for r in range(self.rows):
+            for c in range(self.cols):
                 if self.board[r][c] == 'WH':
                     self.white_horse.set_position(r, c)
                 elif self.board[r][c] == 'BH':
@@ -62,35 +147,27 @@ class Game:
 
 
     # CABALLOS
-    def get_valid_moves(self):
-        moves = []
-        # Movimientos del Caballo: Forma de L
-        # (fila +/- 2, col +/- 1) y (fila +/- 1, col +/- 2)
-        offsets = [
-            (-2, -1), (-2, 1),
-            (-1, -2), (-1, 2),
-            (1, -2), (1, 2),
-            (2, -1), (2, 1)
-        ]
-
-        row, col = self.turn.get_position()
-
-        for dx, dy in offsets:
-            x, y = row + dx, col + dy
-            if 0 <= x < ROWS and 0 <= y < COLS:
-                # Verificar si la casilla está destruida
-                if self.board[x][y] == -20:
-                    continue
-                
-                target = self.board[x][y]
+    def blocked_mask(self):
+        # Casillas a las que ningún caballo puede saltar: destruidas u ocupadas
+        mask = 0
+        for r in range(self.rows):
+            for c in range(self.cols):
+                if self.board[r][c] in (DESTROYED, 'WH', 'BH'):
+                    mask |= 1 << self.geo.square(r, c)
+        return mask
 
-                # Puede moverse a una casilla vacía o capturar al enemigo
-                if target == -20 or target == 'BH' or target == 'WH':
-                    continue
 
-                moves.append((x, y))
 
-        return moves
+    def get_valid_moves_by_horse(self, horse, blocked=None):
+        if blocked is None:
+            blocked = self.blocked_mask()
+        geo = self.geo
+        return [geo.row_col(sq) for sq in geo.legal_moves(geo.square(*horse.get_position()), blocked)]
+
+
+
+    def get_valid_moves(self):
+        return self.get_valid_moves_by_horse(self.turn)
 
 
 
@@ -102,17 +179,20 @@ class Game:
         if (end_row, end_col) not in valides:
             return
 
+        side = WHITE if self.turn == self.white_horse else BLACK
+        self.move_log.append(side << 3 | KNIGHT_OFFSETS.index((end_row - start_row, end_col - start_col)))
+
         # Actualizar posición de la pieza
         self.turn.set_position(end_row, end_col)
 
         
         # Actualizar puntaje (1 punto por movimiento)
         piece = self.board[end_row][end_col]
-        if isinstance(piece, int) and piece != -20:
+        if isinstance(piece, int) and piece != DESTROYED:
             self.turn.score += piece
         
         # Actualizar tablero
-        self.board[start_row][start_col] = -20
+        self.board[start_row][start_col] = DESTROYED
         self.board[end_row][end_col] = self.turn.name
         
         
@@ -121,99 +201,337 @@ class Game:
 
 
     def get_ai_decision(self):
-        _, best_move = self.minimax(self, self.difficulty, True)
+        state = BoardState.from_game(self)
+        if state.turn != WHITE:
+            # La IA juega con blanco; el hash sigue al turno forzado
+            state.turn = WHITE
+            state.zobrist ^= state.keys.turn
+        best_move = self.search(state)
+        if best_move is None:
+            return None
+        return self.geo.row_col(best_move)
+
+
+
+    def search(self, game_state, ponder=False):
+        # Mejor movimiento (índice de casilla) para el caballo en turno de game_state.
+        # Las búsquedas anticipadas del worker (ponder=True) no publican
+        # estadísticas: last_stats y el registro son solo de jugadas reales.
+        self.tt.new_search()
+        self.pv_moves = {}
+        self.nodes = 0
+        self.fit_board(game_state)
+
+        if not self.collect_stats or ponder:
+            return self._search(game_state)
+
+        self.stats = SearchStats()
+        tt_before = self.tt.stats()
+        start = time.perf_counter()
+        try:
+            return self._search(game_state)
+        finally:
+            stats = self.stats
+            stats.elapsed_ms = (time.perf_counter() - start) * 1000
+            if not stats.iterations:
+                stats.iterations.append((self.difficulty, stats.elapsed_ms, stats.nodes))
+            stats.depth = stats.iterations[-1][0]
+            tt_after = self.tt.stats()
+            stats.tt = {key: tt_after[key] - tt_before[key]
+                        for key in ('hits', 'misses', 'collisions', 'stores')}
+            self.stats = None
+            self.last_stats = stats
+            stats.log()
+
+    def check_stop(self):
+        # Interrupción pedida desde otro hilo (motor MCTS; minimax la revisa cada TIME_CHECK_NODES)
+        if self.stop_requested:
+            raise SearchTimeout()
+
+    def fit_board(self, game_state):
+        # Las tablas indexadas por casilla siguen el tamaño del tablero buscado
+        # (un mismo motor puede buscar en tableros de otro tamaño, p. ej. en parallel.py)
+        size = game_state.geo.size
+        if len(self.history[0]) != size:
+            self.history = [[0] * size, [0] * size]
+
+    def _search(self, game_state):
+        if (self.endgame is not None and game_state.legal_moves(game_state.turn)
+                and self.endgame.applies(game_state)):
+            _, best_move = self.endgame.solve(game_state)
+            self.nodes = self.endgame.nodes
+            if self.stats is not None:
+                self.stats.endgame = True
+                # El solucionador no cuenta por ply: todos sus nodos van al total
+                self.stats.nodes_per_ply = [self.endgame.nodes]
+            return best_move
+
+        if self.mcts is not None:
+            return self.mcts.search(game_state, budget_ms=self.time_budget_ms,
+                                    check=self.check_stop, stats=self.stats)
+
+        if self.time_budget_ms is not None:
+            return self.iterative_deepening(game_state, self.time_budget_ms, self.difficulty)
+
+        if self.cache is not None:
+            entry = self.cache.lookup(game_state.zobrist, self.difficulty)
+            if entry is not None and entry[0] in game_state.legal_moves(game_state.turn):
+                return entry[0]
+
+        if self.workers > 1 and self.difficulty > 0 and game_state.legal_moves(game_state.turn):
+            value, best_move = parallel_search(game_state, self.difficulty, self.workers, self.weights)
+        else:
+            # Killers por ply; se reinician en cada búsqueda
+            self.killers = [[None, None] for _ in range(self.difficulty + 1)]
+            value, best_move = self.minimax(game_state.copy(), self.difficulty, game_state.turn == WHITE)
+
+        if self.cache is not None and best_move is not None:
+            self.cache.record(game_state.zobrist, self.difficulty, best_move, value)
+        return best_move
+
+
+
+    def iterative_deepening(self, game_state, budget_ms, max_depth=MAX_SEARCH_DEPTH):
+        # Busca a profundidad 1, 2, 3... hasta agotar el tiempo y devuelve el mejor
+        # movimiento de la última iteración completa. La primera iteración siempre termina.
+        start = time.perf_counter()
+        deadline = start + budget_ms / 1000
+        is_maximizing = game_state.turn == WHITE
+        # Ninguna partida dura más de dos plies por casilla libre
+        free = game_state.geo.size - game_state.blocked().bit_count()
+        best_move = None
+
+        for depth in range(1, min(max_depth, 2 * free) + 1):
+            self.killers = [[None, None] for _ in range(depth + 1)]
+            self.deadline = deadline if depth > 1 else None
+            try:
+                _, move = self.minimax(game_state.copy(), depth, is_maximizing)
+            except SearchTimeout:
+                # Una interrupción externa descarta el resultado; el fin del tiempo no
+                if self.stop_requested:
+                    raise
+                break
+            finally:
+                self.deadline = None
+
+            best_move = move
+            if self.stats is not None:
+                self.stats.iterations.append((depth, (time.perf_counter() - start) * 1000, self.stats.nodes))
+            # La variación principal ordena primero la siguiente iteración
+            pv_state = game_state.copy()
+            self.pv_moves = {}
+            for pv_move in self.principal_variation(game_state, depth):
+                self.pv_moves[pv_state.zobrist] = pv_move
+                pv_state.make_move(pv_move)
+
+            if time.perf_counter() >= deadline:
+                break
+
         return best_move
 
 
 
+    def analyze(self, game_state, depth=None):
+        # Análisis multi-PV: cada movimiento legal del caballo en turno con su valor
+        # exacto (ventana completa) y su variación principal, en una sola búsqueda
+        # que comparte tabla de transposiciones, killers e historial entre
+        # movimientos. Devuelve [(movimiento, valor, variación)] del mejor al peor
+        # para el bando en turno; los valores son blanco - negro como evaluate_board
+        # y el primero coincide con la jugada de search() a la misma profundidad.
+        depth = max(1, self.difficulty if depth is None else depth)
+        self.tt.new_search()
+        self.nodes = 0
+        self.fit_board(game_state)
+        self.killers = [[None, None] for _ in range(depth + 1)]
+
+        state = game_state.copy()
+        side = state.turn
+        lines = []
+        for move in state.legal_moves(side):
+            token = state.make_move(move)
+            value, _ = self.minimax(state, depth - 1, state.turn == WHITE, ply=1)
+            lines.append((move, value, [move] + self.principal_variation(state, depth - 1)))
+            state.unmake_move(token)
+
+        # Orden estable: a igual valor queda primero el de generación, como en la raíz de minimax
+        lines.sort(key=lambda line: -line[1] if side == WHITE else line[1])
+        return lines
+
+
+
+    def principal_variation(self, game_state, depth):
+        # Reconstruye la variación principal siguiendo los mejores movimientos de la tabla
+        state = game_state.copy()
+        pv = []
+        for _ in range(depth):
+            moves = state.legal_moves(state.turn)
+            if not moves:
+                if not state.legal_moves(state.turn ^ 1):
+                    break
+                move = PASS
+            else:
+                entry = self.tt.peek(state.zobrist)
+                if entry is None or entry[4] not in moves:
+                    break
+                move = entry[4]
+            pv.append(move)
+            state.make_move(move)
+        return pv
+
+
+
+    def set_weights(self, weights):
+        self.weights = make_weights(weights)
+        self.score_weight = self.weights['score']
+        self.mobility_weight = self.weights['mobility']
+        # Los valores guardados en la tabla de transposiciones eran de los pesos anteriores
+        self.tt.clear()
+        # La caché de posiciones se calculó con la evaluación por defecto
+        if self.cache is not None and self.weights != DEFAULT_WEIGHTS:
+            raise ValueError("the position cache only holds searches with the default weights")
+
     def evaluate_board(self, game_state):
         # Función Heurística
         # 1. Diferencia de Puntaje (Primaria)
-        score_diff = game_state.white_horse.score - game_state.black_horse.score
+        score_diff = game_state.white_score - game_state.black_score
         
         # 2. Movilidad (Secundaria)
-        # Calcular movimientos disponibles para ambos para fomentar mantener opciones abiertas
-        # y evitar la situación de penalización de -4.
-        white_moves = len(self.get_valid_moves_sim(game_state, game_state.white_horse))
-        black_moves = len(self.get_valid_moves_sim(game_state, game_state.black_horse))
+        # Movimientos disponibles para ambos para fomentar mantener opciones abiertas
+        # y evitar la situación de penalización de -4. BoardState los mantiene
+        # actualizados en cada make_move/unmake_move, así que la evaluación es O(1).
+        white_moves = game_state.white_mobility
+        black_moves = game_state.black_mobility
         
-        mobility_score = (white_moves - black_moves) * 0.5 # Ponderar la movilidad menos que los puntos reales
-
-        return score_diff + mobility_score
-
+        mobility_score = (white_moves - black_moves) * self.mobility_weight # Ponderar la movilidad menos que los puntos reales
+
+        return score_diff * self.score_weight + mobility_score
+
+
+
+    def get_valid_moves_sim(self, game_state, side):
+        # Ayudante para obtener movimientos de un BoardState sin cambiar self.turn
+        return game_state.legal_moves(side)
+
+    def order_moves(self, game_state, moves, ply, tt_move=None):
+        # Ordenamiento de movimientos para la poda alfa-beta:
+        # 0. Variación principal de la iteración anterior y mejor movimiento de la tabla
+        # 1. Casillas de mayor valor
+        # 2. Movimientos que conservan movilidad (salidas libres desde la casilla destino)
+        # 3. Movimientos killer de este ply y luego el historial de cortes
+        blocked = game_state.blocked()
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history[game_state.turn]
+        pv_move = self.pv_moves.get(game_state.zobrist)
+        masks = game_state.geo.masks
+
+        def key(move):
+            mobility = (masks[move] & ~blocked).bit_count()
+            return (move == pv_move, move == tt_move, game_state.value_at(move), mobility, move in killers, history[move])
+
+        return sorted(moves, key=key, reverse=True)
+
+    def store_cutoff(self, game_state, move, depth, ply):
+        # Registrar el movimiento que produjo un corte beta
+        if ply < len(self.killers):
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[game_state.turn][move] += depth * depth
+
+    def root_window(self, moves, move, best_move, best_eval, alpha):
+        # En la raíz se conserva el desempate del minimax original: gana el primer
+        # movimiento (en orden de generación) con el mejor valor. Los movimientos
+        # anteriores al mejor actual se buscan con una ventana que distingue empates.
+        if best_move is None:
+            return alpha
+        if moves.index(move) < moves.index(best_move):
+            return math.nextafter(best_eval, float('-inf'))
+        return best_eval
+
+    def minimax(self, game_state, depth, is_maximizing, alpha=float('-inf'), beta=float('inf'), ply=0):
+        # Minimax con poda alfa-beta sobre un BoardState; los movimientos son índices de casilla
+        self.nodes += 1
+        stats = self.stats
+        if stats is not None:
+            stats.visit(ply)
+        if self.nodes % TIME_CHECK_NODES == 0:
+            if self.stop_requested or (self.deadline is not None and time.perf_counter() >= self.deadline):
+                raise SearchTimeout()
 
-
-    def get_valid_moves_sim(self, game_state, horse):
-        # Ayudante para obtener movimientos para un estado y caballo específicos sin cambiar self.turn
-        moves = []
-        offsets = [
-            (-2, -1), (-2, 1), (-1, -2), (-1, 2),
-            (1, -2), (1, 2), (2, -1), (2, 1)
-        ]
-        row, col = horse.get_position()
-        
-        for dx, dy in offsets:
-            x, y = row + dx, col + dy
-            if 0 <= x < ROWS and 0 <= y < COLS:
-                if game_state.board[x][y] == -20:
-                    continue
-                target = game_state.board[x][y]
-                if target in [-20, 'BH', 'WH']:
-                    continue
-                moves.append((x, y))
-        return moves
-
-    def minimax(self, game_state, depth, is_maximizing):
         # Caso base: Profundidad alcanzada o Fin del Juego
-        white_moves = self.get_valid_moves_sim(game_state, game_state.white_horse)
-        black_moves = self.get_valid_moves_sim(game_state, game_state.black_horse)
-        
-        game_over = len(white_moves) == 0 and len(black_moves) == 0
+        # La movilidad incremental basta para detectar el fin del juego
+        game_over = game_state.white_mobility == 0 and game_state.black_mobility == 0
         
         if depth == 0 or game_over:
+            if stats is not None:
+                stats.leaf_evals += 1
             return self.evaluate_board(game_state), None
 
+        # Tabla de transposiciones: solo se aceptan cotas de la misma profundidad
+        # restante, así el valor coincide con el de la búsqueda a profundidad fija.
+        # En la raíz solo se aprovecha el mejor movimiento para ordenar.
+        key = game_state.zobrist
+        tt_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_move = entry[4]
+            if ply > 0 and entry[1] == depth:
+                flag, value = entry[2], entry[3]
+                if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                    if stats is not None:
+                        stats.tt_cutoffs += 1
+                    return value, tt_move
+        alpha_orig, beta_orig = alpha, beta
+
         if is_maximizing:
             max_eval = float('-inf')
             best_move = None
 
-            if not white_moves:
-                if black_moves:
-                     # IA pasa, el oponente juega (paso de minimización)
-                     # Aplicamos la penalización de -4 al puntaje de la IA en la copia para una evaluación precisa
-                     new_game_state = copy.deepcopy(game_state)
-                     new_game_state.white_horse.score -= 4
-                     eval_score, _ = self.minimax(new_game_state, depth - 1, False)
-                     return eval_score, None
+            if not game_state.white_mobility:
+                # IA pasa, el oponente juega (paso de minimización)
+                # Aplicamos la penalización de -4 al puntaje de la IA para una evaluación precisa
+                if stats is not None:
+                    stats.passes += 1
+                token = game_state.make_move(PASS)
+                eval_score, _ = self.minimax(game_state, depth - 1, False, alpha, beta, ply + 1)
+                game_state.unmake_move(token)
+                return eval_score, None
+
+            white_moves = game_state.legal_moves(WHITE)
+            for move in self.order_moves(game_state, white_moves, ply, tt_move):
+                if ply == 0:
+                    window = self.root_window(white_moves, move, best_move, max_eval, alpha)
                 else:
-                    # Ambos sin movimientos -> Fin del Juego (manejado por el caso base arriba usualmente, pero verificar doblemente)
-                    return self.evaluate_board(game_state), None
+                    window = alpha
 
-            for move in white_moves:
-                # Crear una copia del estado del juego para simular el movimiento
-                new_game_state = copy.deepcopy(game_state)
-                
-                # Ejecutar movimiento en la copia
-                # Necesitamos hacer manualmente lo que hace move() pero en el nuevo estado
-                start_r, start_c = new_game_state.white_horse.get_position()
-                end_r, end_c = move
-                
-                # Update score
-                piece = new_game_state.board[end_r][end_c]
-                if isinstance(piece, int) and piece != -20:
-                    new_game_state.white_horse.score += piece
-                
-                # Actualizar tablero
-                new_game_state.board[start_r][start_c] = -20
-                new_game_state.board[end_r][end_c] = 'WH'
-                new_game_state.white_horse.set_position(end_r, end_c)
+                # Simular el movimiento sobre el mismo estado y deshacerlo después
+                token = game_state.make_move(move)
                 
                 # Llamada recursiva (Paso de minimización)
-                eval_score, _ = self.minimax(new_game_state, depth - 1, False)
+                eval_score, _ = self.minimax(game_state, depth - 1, False, window, beta, ply + 1)
+                game_state.unmake_move(token)
                 
-                if eval_score > max_eval:
+                if eval_score > max_eval or (ply == 0 and eval_score == max_eval
+                                             and white_moves.index(move) < white_moves.index(best_move)):
                     max_eval = eval_score
                     best_move = move
+
+                if ply > 0:
+                    alpha = max(alpha, max_eval)
+                if max_eval >= beta:
+                    if stats is not None:
+                        stats.cutoffs += 1
+                    self.store_cutoff(game_state, move, depth, ply)
+                    break
+
+            if max_eval <= alpha_orig:
+                flag = UPPER
+            elif max_eval >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.tt.store(key, depth, flag, max_eval, best_move)
             
             return max_eval, best_move
         
@@ -221,36 +539,47 @@ class Game:
             min_eval = float('inf')
             best_move = None
             
-            if not black_moves:
-                if white_moves:
-                    # Jugador pasa, IA juega (paso de maximización)
-                    # Jugador recibe penalización de -4
-                    new_game_state = copy.deepcopy(game_state)
-                    new_game_state.black_horse.score -= 4
-                    eval_score, _ = self.minimax(new_game_state, depth - 1, True)
-                    return eval_score, None
+            if not game_state.black_mobility:
+                # Jugador pasa, IA juega (paso de maximización)
+                # Jugador recibe penalización de -4
+                if stats is not None:
+                    stats.passes += 1
+                token = game_state.make_move(PASS)
+                eval_score, _ = self.minimax(game_state, depth - 1, True, alpha, beta, ply + 1)
+                game_state.unmake_move(token)
+                return eval_score, None
+
+            black_moves = game_state.legal_moves(BLACK)
+            for move in self.order_moves(game_state, black_moves, ply, tt_move):
+                if ply == 0:
+                    window = -self.root_window(black_moves, move, best_move, -min_eval, -beta)
                 else:
-                    return self.evaluate_board(game_state), None
+                    window = beta
 
-            for move in black_moves:
-                new_game_state = copy.deepcopy(game_state)
+                token = game_state.make_move(move)
+                eval_score, _ = self.minimax(game_state, depth - 1, True, alpha, window, ply + 1)
+                game_state.unmake_move(token)
                 
-                start_r, start_c = new_game_state.black_horse.get_position()
-                end_r, end_c = move
-                
-                piece = new_game_state.board[end_r][end_c]
-                if isinstance(piece, int) and piece != -20:
-                    new_game_state.black_horse.score += piece
-                
-                new_game_state.board[start_r][start_c] = -20
-                new_game_state.board[end_r][end_c] = 'BH'
-                new_game_state.black_horse.set_position(end_r, end_c)
-                
-                eval_score, _ = self.minimax(new_game_state, depth - 1, True)
-                
-                if eval_score < min_eval:
+                if eval_score < min_eval or (ply == 0 and eval_score == min_eval
+                                             and black_moves.index(move) < black_moves.index(best_move)):
                     min_eval = eval_score
                     best_move = move
+
+                if ply > 0:
+                    beta = min(beta, min_eval)
+                if min_eval <= alpha:
+                    if stats is not None:
+                        stats.cutoffs += 1
+                    self.store_cutoff(game_state, move, depth, ply)
+                    break
+
+            if min_eval >= beta_orig:
+                flag = LOWER
+            elif min_eval <= alpha:
+                flag = UPPER
+            else:
+                flag = EXACT
+            self.tt.store(key, depth, flag, min_eval, best_move)
             
             return min_eval, best_move
 
@@ -258,6 +587,14 @@ class Game:
 
 
     # ESTADO DEL JUEGO
+    def pass_turn(self):
+        # El caballo en turno no tiene movimientos y cede el turno
+        side = WHITE if self.turn == self.white_horse else BLACK
+        self.move_log.append(PASS_BYTE | side)
+        self.change_turn()
+
+
+
     def change_turn(self):
         if self.turn == self.black_horse:
             self.turn = self.white_horse
@@ -276,38 +613,9 @@ class Game:
 
 
     def game_over(self):
-        def get_valid_moves_by_horse(horse):
-            moves = []
-            # Knight moves: L-shape
-            # (row +/- 2, col +/- 1) and (row +/- 1, col +/- 2)
-            offsets = [
-                (-2, -1), (-2, 1),
-                (-1, -2), (-1, 2),
-                (1, -2), (1, 2),
-                (2, -1), (2, 1)
-            ]
-
-            row, col = horse.get_position()
-
-            for dx, dy in offsets:
-                x, y = row + dx, col + dy
-                if 0 <= x < ROWS and 0 <= y < COLS:
-                    # Verificar si la casilla está destruida
-                    if self.board[x][y] == -20:
-                        continue
-                    
-                    target = self.board[x][y]
-
-                    # No puede moverse a casilla vacía o capturar enemigo
-                    if target in [-20, 'BH', 'WH']:
-                        continue
-
-                    moves.append((x, y))
-
-            return moves
-        
-        white_moves = get_valid_moves_by_horse(self.white_horse)
-        black_moves = get_valid_moves_by_horse(self.black_horse)
+        blocked = self.blocked_mask()
+        white_moves = self.get_valid_moves_by_horse(self.white_horse, blocked)
+        black_moves = self.get_valid_moves_by_horse(self.black_horse, blocked)
 
         if len(white_moves) == 0 and len(black_moves) == 0:
             return True
@@ -315,12 +623,12 @@ class Game:
         if len(white_moves) == 0:
             if not self.white_horse_penality:
                 self.white_horse_penality = True
-                self.white_horse.score -= 4
+                self.white_horse.score -= PASS_PENALTY
             
         if len(black_moves) == 0:
             if not self.black_horse_penality:
                 self.black_horse_penality = True
-                self.black_horse.score -= 4
+                self.black_horse.score -= PASS_PENALTY
             
         return False
 
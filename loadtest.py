@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from server import DEFAULT_HOST, DEFAULT_PORT
+
+# Cliente de carga para server.py: muchas sesiones jugando a la vez (el
+# jugador negro elige al azar) sobre unas pocas conexiones, más sesiones
+# inactivas opcionales. Mide la latencia de cada jugada (petición "move"
+# hasta su respuesta, que incluye la jugada de la IA) y reporta p50/p99.
+#
+#   python loadtest.py --spawn --sessions 200 --connections 8 --difficulty 2
+#   python loadtest.py --port 8765 --sessions 50 --idle 5000
+
+# Espera antes de reintentar una petición rechazada por "busy" u "overloaded"
+RETRY_S = 0.05
+
+
+class Client:
+    # Conexión con peticiones concurrentes: las respuestas se asocian por "id"
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count(1)
+        self.waiting = {}
+        self.listener = asyncio.get_running_loop().create_task(self._listen())
+
+    @classmethod
+    async def connect(cls, host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None):
+        if unix is not None:
+            reader, writer = await asyncio.open_unix_connection(unix, limit=1 << 20)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+        return cls(reader, writer)
+
+    async def _listen(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self.waiting.pop(response.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self.waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("server closed the connection"))
+
+    async def request(self, op, **fields):
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+        self.writer.write(json.dumps(dict(fields, id=request_id, op=op)).encode() + b'\n')
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.writer.close()
+        self.listener.cancel()
+
+
+class Results:
+    def __init__(self):
+        self.latencies = []
+        self.games = 0
+        self.retries = 0
+        self.errors = []
+
+
+async def call(client, results, op, **fields):
+    # Petición con reintento para los rechazos temporales
+    while True:
+        response = await client.request(op, **fields)
+        if response['ok']:
+            return response
+        if response['error'] in ('busy', 'overloaded'):
+            results.retries += 1
+            await asyncio.sleep(RETRY_S)
+            continue
+        raise RuntimeError(f"{op}: {response['error']}")
+
+
+async def play(client, results, rng, games, options):
+    for _ in range(games):
+        info = await call(client, results, 'new', **options)
+        session = info['session']
+        while not info['over']:
+            target = rng.choice(info['moves'])
+            start = time.perf_counter()
+            info = await call(client, results, 'move', session=session, to=target)
+            results.latencies.append((time.perf_counter() - start) * 1000)
+        await call(client, results, 'close', session=session)
+        results.games += 1
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def load_test(args, address):
+    clients = [await Client.connect(*address) for _ in range(args.connections)]
+    results = Results()
+    options = {'difficulty': args.difficulty, 'engine': args.engine}
+    if args.time_ms is not None:
+        options['time_ms'] = args.time_ms
+    if args.size is not None:
+        options['size'] = args.size
+
+    before = (await clients[0].request('stats'))
+
+    # Sesiones inactivas: se crean y se dejan abiertas
+    if args.idle:
+        idle_options = dict(options, difficulty=1)
+        idle_options.pop('time_ms', None)
+        for start in range(0, args.idle, 256):
+            count = min(256, args.idle - start)
+            await asyncio.gather(*(call(clients[i % len(clients)], results, 'new', **idle_options)
+                                   for i in range(start, start + count)))
+        idle_stats = await clients[0].request('stats')
+        grown = idle_stats['max_rss_kb'] - before['max_rss_kb']
+        print(f"idle: {idle_stats['sessions']} sessions open, server max RSS "
+              f"{idle_stats['max_rss_kb'] / 1024:.1f} MiB (+{grown / 1024:.1f} MiB)")
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    tasks = [play(clients[i % len(clients)], results, random.Random(rng.random()), args.games, options)
+             for i in range(args.sessions)]
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    results.errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+
+    after = await clients[0].request('stats')
+    for client in clients:
+        await client.close()
+    return results, elapsed, after
+
+
+def report(results, elapsed, stats):
+    lat = results.latencies
+    lines = [
+        f"{results.games} games, {len(lat)} moves in {elapsed:.1f} s ({len(lat) / elapsed:.1f} moves/s)",
+        f"  move latency ms: p50 {percentile(lat, 50):.1f}  p90 {percentile(lat, 90):.1f}  "
+        f"p99 {percentile(lat, 99):.1f}  max {max(lat, default=0.0):.1f}",
+        f"  retries {results.retries}  errors {len(results.errors)}",
+        f"  server: {stats['sessions']} sessions, {stats['completed']} AI moves, "
+        f"{stats['workers']} workers, max RSS {stats['max_rss_kb'] / 1024:.1f} MiB",
+    ]
+    for error in results.errors[:5]:
+        lines.append(f"  error: {error!r}")
+    return '\n'.join(lines)
+
+
+def spawn_server(workers):
+    # Servidor propio en un socket Unix temporal; devuelve (proceso, ruta)
+    path = os.path.join(tempfile.mkdtemp(), 'server.sock')
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py'),
+               '--unix', path]
+    if workers:
+        command += ['--workers', str(workers)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    for _ in range(200):
+        if os.path.exists(path):
+            return process, path
+        if process.poll() is not None:
+            break
+        time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for the Smart Horses server")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help="connect to a Unix socket instead of TCP")
+    parser.add_argument('--spawn', action='store_true', help="start a server on a temporary Unix socket")
+    parser.add_argument('--workers', type=int, help="worker processes of the spawned server")
+    parser.add_argument('--sessions', type=int, default=100, help="concurrent playing sessions")
+    parser.add_argument('--connections', type=int, default=4, help="connections shared by the sessions")
+    parser.add_argument('--games', type=int, default=1, help="games per session")
+    parser.add_argument('--idle', type=int, default=0, help="extra sessions opened and left idle")
+    parser.add_argument('--difficulty', type=int, default=2)
+    parser.add_argument('--engine', default='minimax', choices=['minimax', 'mcts'])
+    parser.add_argument('--time-ms', type=int, help="AI time budget per move")
+    parser.add_argument('--size', type=int, help="board size")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    process = None
+    if args.spawn:
+        process, args.unix = spawn_server(args.workers)
+    address = (None, None, args.unix) if args.unix else (args.host, args.port)
+    try:
+        results, elapsed, stats = asyncio.run(load_test(args, address))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    print(report(results, elapsed, stats))
+    return 1 if results.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,25 @@
+import argparse
 import pygame
 import sys
 import os
+import logging
 from settings import *
-from game import Game, Horse
+from game import Game, Horse, MAX_SEARCH_DEPTH
+from state import BoardState
+from worker import AIWorker, PENDING, FAILED
+from cache import PositionCache, user_cache_dir
+from render import BoardRenderer
+from timeline import Timeline
+from weights import load_weights
+
+# Evento que publica el hilo de la IA cuando tiene la jugada lista
+AI_RESULT = pygame.USEREVENT + 1
+# Únicos eventos que despiertan el bucle; el movimiento del ratón no redibuja nada
+LOOP_EVENTS = [pygame.QUIT, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN,
+               pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE, AI_RESULT]
 
 class GUI:
-    def __init__(self):
+    def __init__(self, phase_ms=None, turbo=False, weights=None):
         # Inicializar Pygame
         pygame.init()
         pygame.font.init()
@@ -14,11 +28,27 @@ class GUI:
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption('Chess Knight Project')
         self.clock = pygame.time.Clock()
+        # Fases con duración ("pensando", "resaltar objetivo", "saltar turno")
+        # sin bloquear el bucle de eventos
+        self.timeline = Timeline()
+        self.phase_ms = dict(PHASE_MS, **(phase_ms or {}))
+        self.turbo = turbo
+        # Pesos de evaluación de la IA (archivo de tune.py); None usa los de weights.py
+        self.weights = weights
 
         self.font = pygame.font.SysFont('Arial', 32, bold=True)
         self.small_font = pygame.font.SysFont('Arial', 20)
         self.assets = {}
         self._load_assets()
+        self.board_size = BOARD_SIZES[0] # Lado del tablero (tecla B en la pantalla de inicio)
+        self.renderer = BoardRenderer(self.screen, self.assets, self.font, self.small_font)
+        # Movimientos válidos del turno actual; se recalculan solo cuando cambia el estado
+        self.valid_moves = set()
+        self.moves_key = None
+        # Textos del panel ya dibujados; el panel se repinta solo si cambian
+        self.panel_lines = None
+        self.game_over_drawn = False
+        self.start_buttons = None # Botones de la pantalla de inicio ya dibujada
 
         self.game = None # El juego comienza después de la selección de dificultad
         self.difficulty = None
@@ -27,6 +57,55 @@ class GUI:
         self.status_message = "Welcome! Select difficulty."
         self.ai_target_pos = None # Para resaltar el movimiento intencionado de la IA
 
+        # La IA busca en un hilo aparte para no congelar la ventana
+        self.worker = None
+        self.ai_request = None # Petición de búsqueda en curso
+        self.pondering = False # Ya se pidió analizar el turno actual del jugador
+        self.show_stats = False # Superposición de estadísticas de búsqueda (tecla S)
+        self.show_hints = False # Valor de cada jugada del jugador sobre su casilla (tecla H)
+        self.hints = {}
+        self.hint_engine = None
+
+        # Caché de posiciones en disco: se mapea en memoria al arrancar y se
+        # guarda en segundo plano al terminar cada partida. Sus búsquedas usan
+        # los pesos por defecto, así que con otros pesos no se abre.
+        try:
+            self.cache = PositionCache() if weights is None else None
+        except (OSError, ValueError):
+            logging.getLogger('smart_horses').warning("position cache unavailable")
+            self.cache = None
+        self.cache_saved = False
+
+
+
+    def start_game(self):
+        if self.worker is not None:
+            self.worker.stop()
+        self.game = Game(collect_stats=self.show_stats, cache=self.cache, weights=self.weights,
+                         rows=self.board_size, cols=self.board_size, **self.difficulty)
+        if (self.renderer.rows, self.renderer.cols) != (self.game.rows, self.game.cols):
+            self.renderer = BoardRenderer(self.screen, self.assets, self.font, self.small_font,
+                                          self.game.rows, self.game.cols)
+        self.worker = AIWorker(self.game, notify=lambda: pygame.event.post(pygame.event.Event(AI_RESULT)))
+        self.worker.start()
+        self.timeline.clear()
+        self.ai_request = None
+        self.pondering = False
+        self.cache_saved = False
+        self.is_game_over = False
+        self.winner = None
+        self.invalidate()
+
+
+
+    def invalidate(self):
+        # Forzar un repintado completo en el siguiente refresh
+        self.renderer.invalidate()
+        self.moves_key = None
+        self.panel_lines = None
+        self.game_over_drawn = False
+        self.start_buttons = None
+
 
 
     def draw_start_screen(self):
@@ -36,20 +115,25 @@ class GUI:
         title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, 100))
         self.screen.blit(title_text, title_rect)
         
-        subtitle_text = self.small_font.render("Select Difficulty", True, COLOR_TEXT)
+        subtitle_text = self.small_font.render(
+            f"Select Difficulty - Board {self.board_size}x{self.board_size} (B to change)", True, COLOR_TEXT)
         subtitle_rect = subtitle_text.get_rect(center=(SCREEN_WIDTH // 2, 160))
         self.screen.blit(subtitle_text, subtitle_rect)
 
-        # Botones
+        # Botones: cada nivel son los argumentos con los que se crea el Game
         buttons = [
-            ("Beginner (Depth 2)", 2, 200),
-            ("Amateur (Depth 4)", 4, 280),
-            ("Expert (Depth 6)", 6, 360)
+            ("Beginner (Depth 2)", {'difficulty': 2}, 200),
+            ("Amateur (Depth 4)", {'difficulty': 4}, 268),
+            ("Expert (Depth 6)", {'difficulty': 6}, 336),
+            ("Master (Depth 8)", {'difficulty': 8}, 404),
+            ("Legend (Depth 10)", {'difficulty': 10}, 472),
+            ("Timed (200 ms)", {'difficulty': MAX_SEARCH_DEPTH, 'time_budget_ms': 200}, 540),
+            ("Monte Carlo (1 s)", {'engine': 'mcts', 'time_budget_ms': 1000}, 608)
         ]
 
         button_rects = []
         for text, diff, y in buttons:
-            rect = pygame.Rect(0, 0, 300, 60)
+            rect = pygame.Rect(0, 0, 300, 54)
             rect.center = (SCREEN_WIDTH // 2, y)
             pygame.draw.rect(self.screen, (200, 200, 200), rect)
             pygame.draw.rect(self.screen, (0, 0, 0), rect, 2)
@@ -84,103 +168,130 @@ class GUI:
 
 
     def get_row_col_from_mouse(self, pos):
-        x, y = pos
-        if y < PANEL_HEIGHT:
-            return None, None
-        col = x // TILE_SIZE
-        row = (y - PANEL_HEIGHT) // TILE_SIZE
-        return row, col
+        return self.renderer.square_at(pos)
 
     def draw_panel(self):
-        # Dibujar fondo del panel
-        pygame.draw.rect(self.screen, COLOR_PANEL, (0, 0, SCREEN_WIDTH, PANEL_HEIGHT))
-        
-        # Dibujar Información
+        # Textos del panel; solo se vuelve a dibujar si alguno cambió
         try:
-            turn_text = self.font.render(f"Turn: {self.game.turn.name}", True, COLOR_TEXT)
-            self.screen.blit(turn_text, (20, 20))
+            turn = f"Turn: {self.game.turn.name}"
         except AttributeError:
-            turn_text = self.font.render("Turn: -", True, COLOR_TEXT)
-            self.screen.blit(turn_text, (20, 20))
-        
+            turn = "Turn: -"
+
         # Puntajes
         try:
-            score_text = self.small_font.render(f"Scores => White (AI): {self.game.white_horse.score}  VS  Black (Player): {self.game.black_horse.score}", True, COLOR_TEXT)
-            self.screen.blit(score_text, (20, 60))
+            scores = f"Scores => White (AI): {self.game.white_horse.score}  VS  Black (Player): {self.game.black_horse.score}"
         except AttributeError:
-            score_text = self.small_font.render("Scores => White (AI): -  VS  Black (Player): -", True, COLOR_TEXT)
-            self.screen.blit(score_text, (20, 60))
-        
+            scores = "Scores => White (AI): -  VS  Black (Player): -"
+
         try:
-            info_text = self.small_font.render(f"White: AI (Depth {self.game.difficulty}) | Black: Player", True, COLOR_TEXT)
-            self.screen.blit(info_text, (20, 85))
+            if self.game.mcts is not None:
+                budget = self.game.time_budget_ms
+                level = f"MCTS {budget} ms" if budget is not None else f"MCTS {self.game.mcts.iterations} rollouts"
+            elif self.game.time_budget_ms is not None:
+                level = f"{self.game.time_budget_ms} ms"
+            else:
+                level = f"Depth {self.game.difficulty}"
+            info = f"White: AI ({level}) | Black: Player"
         except AttributeError:
-            info_text = self.small_font.render("White: AI (Depth -) | Black: Player", True, COLOR_TEXT)
-            self.screen.blit(info_text, (20, 85))
+            info = "White: AI (Depth -) | Black: Player"
 
         # Mensaje de Estado
-        try:
-            status_text = self.small_font.render(f"Status: {self.status_message}", True, (255, 50, 50))
-            self.screen.blit(status_text, (20, 110))
-        except AttributeError:
-            status_text = self.small_font.render("Status: -", True, (255, 50, 50))
-            self.screen.blit(status_text, (20, 110))
+        status = f"Status: {self.status_message}"
+        stats = self.stats_lines() if self.show_stats else []
 
+        lines = (turn, scores, info, status, tuple(stats))
+        if lines == self.panel_lines:
+            return []
+        self.panel_lines = lines
 
+        # Dibujar fondo del panel
+        panel_rect = pygame.Rect(0, 0, SCREEN_WIDTH, PANEL_HEIGHT)
+        pygame.draw.rect(self.screen, COLOR_PANEL, panel_rect)
+
+        # Dibujar Información
+        self.screen.blit(self.font.render(turn, True, COLOR_TEXT), (20, 20))
+        self.screen.blit(self.small_font.render(scores, True, COLOR_TEXT), (20, 60))
+        self.screen.blit(self.small_font.render(info, True, COLOR_TEXT), (20, 85))
+        self.screen.blit(self.small_font.render(status, True, (255, 50, 50)), (20, 110))
+
+        # Estadísticas de la última búsqueda, en la esquina superior derecha del panel
+        for i, line in enumerate(stats):
+            text = self.small_font.render(line, True, (255, 255, 0))
+            self.screen.blit(text, (SCREEN_WIDTH - text.get_width() - 10, 8 + i * 24))
+        return [panel_rect]
+
+
+
+    def stats_lines(self):
+        stats = self.game.last_stats if self.game else None
+        if stats is None:
+            return ["Search stats: waiting..."]
+        tt = stats.tt
+        probes = tt.get('hits', 0) + tt.get('misses', 0)
+        hit_rate = tt.get('hits', 0) / probes if probes else 0.0
+        if stats.endgame:
+            return [
+                f"Exact endgame {stats.nodes} nodes",
+                f"{stats.elapsed_ms:.0f} ms",
+            ]
+        if stats.rollouts:
+            return [
+                f"MCTS {stats.rollouts} rollouts {stats.elapsed_ms:.0f} ms",
+                f"{stats.rollouts_per_second():.0f}/s depth {stats.depth} reused {stats.reused}",
+            ]
+        return [
+            f"D{stats.depth} {stats.nodes} nodes {stats.elapsed_ms:.0f} ms",
+            f"EBF {stats.branching_factor():.2f} cut {stats.cutoffs} TT {hit_rate:.0%}",
+        ]
+
+    def toggle_stats(self):
+        self.show_stats = not self.show_stats
+        if self.game:
+            self.game.collect_stats = self.show_stats
+        if self.show_stats and not logging.getLogger('smart_horses.search').handlers:
+            # Cada búsqueda queda registrada en search_stats.log, junto a la caché
+            os.makedirs(user_cache_dir(), exist_ok=True)
+            handler = logging.FileHandler(os.path.join(user_cache_dir(), 'search_stats.log'))
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger = logging.getLogger('smart_horses.search')
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+
+
+
+    def toggle_hints(self):
+        self.show_hints = not self.show_hints
+        # Recalcular (o quitar) los valores en el siguiente refresh
+        self.moves_key = None
+
+    def analyze_moves(self):
+        # Valores de las jugadas del jugador (negro) con un análisis multi-PV.
+        # Usa su propio motor: el del Game lo ocupa el hilo de la IA.
+        if self.hint_engine is None:
+            self.hint_engine = Game(difficulty=HINT_DEPTH, tt_max_bytes=4 * 1024 * 1024, endgame_squares=0,
+                                    weights=self.weights)
+        lines = self.hint_engine.analyze(BoardState.from_game(self.game), HINT_DEPTH)
+        # Valor para el jugador: negro - blanco
+        return {self.game.geo.row_col(move): f"{0.0 - value:+g}" for move, value, _ in lines}
 
     def draw_board(self):
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.game.board[row][col]
-
-                # Determinar color
-                color = COLOR_BOARD_LIGHT if (row + col) % 2 == 0 else COLOR_BOARD_DARK
-                
-                # Dibujar casilla (desplazada por PANEL_HEIGHT)
-                rect = (col * TILE_SIZE, row * TILE_SIZE + PANEL_HEIGHT, TILE_SIZE, TILE_SIZE)
-                pygame.draw.rect(self.screen, color, rect)
-                
-                # Dibujar Casilla Destruida
-                if piece == -20:
-                    if 'destroy' in self.assets:
-                        self.screen.blit(self.assets['destroy'], (col * TILE_SIZE, row * TILE_SIZE + PANEL_HEIGHT))
-                    else:
-                        # Visual alternativo
-                        pygame.draw.rect(self.screen, (50, 50, 50), rect)
-                
-                # Dibujar Resaltado si es movimiento válido
-                if (row, col) in self.game.get_valid_moves():
-                    # Crear una superficie para transparencia
-                    s = pygame.Surface((TILE_SIZE, TILE_SIZE))
-                    s.set_alpha(128)
-                    s.fill(COLOR_HIGHLIGHT)
-                    self.screen.blit(s, (col * TILE_SIZE, row * TILE_SIZE + PANEL_HEIGHT))
-                
-                # Dibujar Resaltado de Objetivo de IA
-                if self.ai_target_pos == (row, col):
-                    s = pygame.Surface((TILE_SIZE, TILE_SIZE))
-                    s.set_alpha(180)
-                    s.fill((255, 0, 0)) # Resaltado rojo para intención de IA
-                    self.screen.blit(s, (col * TILE_SIZE, row * TILE_SIZE + PANEL_HEIGHT))
-
-                if piece not in [-20, 'WH', 'BH', 0]:
-                    # Renderizar el entero como texto
-                    piece_text = self.small_font.render(str(piece), True, (0, 0, 0))
-                    text_rect = piece_text.get_rect(center=(col * TILE_SIZE + TILE_SIZE // 2,
-                                                                row * TILE_SIZE + PANEL_HEIGHT + TILE_SIZE // 2))
-                    self.screen.blit(piece_text, text_rect)
-                    
-                # Dibujar Pieza
-                if piece in ['WH', 'BH']:
-                    if piece in self.assets:
-                        self.screen.blit(self.assets[piece], (col * TILE_SIZE, row * TILE_SIZE + PANEL_HEIGHT))
-                    else:
-                        # Texto alternativo
-                        text_color = (0, 0, 0) if piece == 'WH' else (50, 50, 50)
-                        piece_text = self.font.render(piece, True, text_color)
-                        text_rect = piece_text.get_rect(center=(col * TILE_SIZE + TILE_SIZE // 2, 
-                                                                row * TILE_SIZE + PANEL_HEIGHT + TILE_SIZE // 2))
-                        self.screen.blit(piece_text, text_rect)
+        # Movimientos válidos una sola vez por cambio de estado (no una vez por casilla)
+        key = (self.game.turn.name, self.game.white_horse.position, self.game.black_horse.position)
+        if key != self.moves_key:
+            self.moves_key = key
+            self.valid_moves = set(self.game.get_valid_moves())
+            self.hints = {}
+            if self.show_hints and self.game.turn == self.game.black_horse and self.valid_moves:
+                self.hints = self.analyze_moves()
+        return self.renderer.draw(self.game.board, self.valid_moves, self.ai_target_pos, self.hints)
+
+
+
+    def refresh(self):
+        # Dibuja panel y tablero y envía a la pantalla solo lo que cambió
+        rects = self.draw_panel() + self.draw_board()
+        if rects:
+            pygame.display.update(rects)
 
 
 
@@ -227,123 +338,203 @@ class GUI:
 
 
 
-    def run(self):
-        while self.running:
-            self.clock.tick(FPS)
-            
-            if self.state == 'START':
-                button_rects = self.draw_start_screen()
-                
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        self.running = False
-                    
-                    if event.type == pygame.MOUSEBUTTONDOWN:
-                        pos = pygame.mouse.get_pos()
-                        for rect, diff in button_rects:
-                            if rect.collidepoint(pos):
-                                self.difficulty = diff
-                                self.game = Game(difficulty=self.difficulty)
-                                self.state = 'PLAYING'
-                
+    def advance(self):
+        # Se llama solo después de un cambio de estado (partida nueva, jugada o
+        # paso de turno), no en cada fotograma
+        self.is_game_over = self.game.game_over()
+        if self.is_game_over:
+            self.winner = self.game.check_winner()
+            self.status_message = f"Game Over! Winner: {self.winner}"
+            if self.cache is not None and not self.cache_saved:
+                self.cache.save_async()
+                self.cache_saved = True
+            return
+
+        # Verificar si el jugador actual tiene movimientos
+        if not self.game.get_valid_moves():
+            # Mostrar el mensaje un momento antes de saltar
+            self.status_message = f"No moves for {self.game.turn.name}. Skipping turn..."
+            self.timeline.schedule('skip', self.phase('skip'), self.skip_turn)
+            return
+
+        if self.game.turn == self.game.white_horse:
+            # 1. Actualizar Estado a Pensando
+            self.status_message = "AI Thinking..."
+            # 2. Retraso Artificial para "Pensando", luego 3. pedir la jugada
+            self.timeline.schedule('think', self.phase('think'), self.request_ai_move)
+        else:
+            # Actualizar estado para turno del jugador
+            self.status_message = "Your Turn (Black Horse)"
+            # Mientras el jugador piensa, la IA prepara sus respuestas
+            if not self.pondering:
+                self.worker.ponder(BoardState.from_game(self.game))
+                self.pondering = True
+
+
+
+    def phase(self, name):
+        return 0 if self.turbo else self.phase_ms[name]
+
+    def toggle_turbo(self):
+        # Al activarlo, la fase en curso también termina ya
+        self.turbo = not self.turbo
+        if self.turbo:
+            self.timeline.fast_forward()
+
+    def skip_turn(self):
+        self.game.pass_turn()
+        self.advance()
+
+    def request_ai_move(self):
+        # Pedir la decisión al hilo de la IA; avisa con un evento AI_RESULT
+        self.ai_request = self.worker.submit(BoardState.from_game(self.game))
+        self.pondering = False
+
+    def play_ai_move(self, move):
+        # 6. Ejecutar Movimiento
+        self.game.move(move)
+        self.ai_target_pos = None # Limpiar resaltado
+        self.advance()
+
+
+
+    def on_ai_result(self):
+        # Revisar si el hilo de la IA ya respondió
+        if self.ai_request is None:
+            return
+        result = self.worker.poll(self.ai_request)
+        if result is PENDING:
+            return
+        self.ai_request = None
+        if result is FAILED:
+            # El detalle queda en el registro (logger smart_horses.worker)
+            self.status_message = "AI search failed! (see log)"
+            return
+        best_move = self.game.geo.row_col(result) if result is not None else None
+        if best_move:
+            # 4. Resaltar Objetivo
+            self.ai_target_pos = best_move
+            self.status_message = f"AI moving to {best_move}..."
+            # 5. Retraso para mostrar resaltado, luego 6. mover
+            self.timeline.schedule('target', self.phase('target'), lambda: self.play_ai_move(best_move))
+        else:
+            # Debería ser manejado por la verificación de no movimientos, pero por si acaso
+            self.status_message = "AI has no moves!"
+
+
+
+    def on_click(self, pos):
+        if self.state == 'START':
+            for rect, diff in self.start_buttons:
+                if rect.collidepoint(pos):
+                    self.difficulty = diff
+                    self.start_game()
+                    self.state = 'PLAYING'
+                    self.advance()
+            return
+
+        if self.is_game_over:
+            button_rect = pygame.Rect(0, 0, 200, 50)
+            button_rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 80)
+            if button_rect.collidepoint(pos):
+                self.state = 'START' # Volver a la pantalla de inicio
+                self.invalidate()
+            return
+
+        # Clics de lógica del juego
+        if self.game.turn == self.game.black_horse:
+            row, col = self.get_row_col_from_mouse(pos)
+            if row is not None and col is not None:
+                self.game.move(end=(row, col))
+                if self.game.turn != self.game.black_horse:
+                    self.advance()
+
+
+
+    def draw(self):
+        # Dibuja solo lo que cambió desde la última vez
+        if self.state == 'START':
+            if self.start_buttons is None:
+                self.start_buttons = self.draw_start_screen()
                 pygame.display.update()
-                continue
+        elif not self.is_game_over:
+            self.refresh()
+        elif not self.game_over_drawn:
+            # La superposición de fin de partida se pinta una vez sobre el tablero completo
+            self.invalidate()
+            self.draw_panel()
+            self.draw_board()
+            self.draw_game_over(self.winner)
+            pygame.display.update()
+            self.game_over_drawn = True
 
-            # ESTADO DE JUEGO
-            game_over = self.game.game_over()
-            winner = None
 
-            if game_over:
-                winner = self.game.check_winner()
-                self.status_message = f"Game Over! Winner: {winner}"
-                
+
+    def run(self):
+        # Bucle por eventos: sin entrada ni respuesta de la IA el proceso queda
+        # bloqueado en pygame.event.wait y no consume CPU. Con fases pendientes
+        # la espera dura como máximo hasta la siguiente.
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(LOOP_EVENTS)
+
+        while self.running:
+            self.timeline.run_due()
+            self.draw()
+            timeout = self.timeline.timeout()
+            if timeout is None:
+                event = pygame.event.wait()
+            elif timeout == 0:
+                event = pygame.event.poll()
             else:
-                # Verificar si el jugador actual tiene movimientos
-                if not self.game.get_valid_moves():
-                    self.status_message = f"No moves for {self.game.turn.name}. Skipping turn..."
-                    # Dibujar para mostrar mensaje antes de saltar
-                    self.draw_panel()
-                    self.draw_board()
-                    pygame.display.update()
-                    pygame.time.wait(1500)
-                    
-                    self.game.change_turn()
-                    continue
-
-            if self.game.turn == self.game.white_horse and not game_over:
-                # 1. Actualizar Estado a Pensando
-                self.status_message = "AI Thinking..."
-                self.draw_panel()
-                self.draw_board()
-                pygame.display.update()
-                
-                # 2. Retraso Artificial para "Pensando"
-                pygame.time.wait(500)
-                
-                # 3. Obtener Decisión
-                best_move = self.game.get_ai_decision()
-                
-                if best_move:
-                    # 4. Resaltar Objetivo
-                    self.ai_target_pos = best_move
-                    self.status_message = f"AI moving to {best_move}..."
-                    self.draw_panel()
-                    self.draw_board()
-                    pygame.display.update()
-                    
-                    # 5. Retraso para mostrar resaltado
-                    pygame.time.wait(1000)
-                    
-                    # 6. Ejecutar Movimiento
-                    self.game.move(best_move)
-                    self.ai_target_pos = None # Limpiar resaltado
-                else:
-                    # Debería ser manejado por la verificación de no movimientos, pero por si acaso
-                    self.status_message = "AI has no moves!"
-                    self.draw_panel()
-                    self.draw_board()
-                    pygame.display.update()
-                    pygame.time.wait(1000)
-            
-            # Actualizar estado para turno del jugador
-            if self.game and self.game.turn == self.game.black_horse and not game_over:
-                 self.status_message = "Your Turn (Black Horse)"
-
-            # Manejo de Eventos
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    pos = pygame.mouse.get_pos()
-                    
-                    if game_over:
-                        button_rect = pygame.Rect(0, 0, 200, 50)
-                        button_rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 80)
-                        if button_rect.collidepoint(pos):
-                            self.state = 'START' # Volver a la pantalla de inicio
-                            self.game = Game(difficulty=self.difficulty)
-                            game_over = False
-                            winner = None
-                    else:
-                        # Clics de lógica del juego
-                        if self.game.turn == self.game.black_horse:
-                             row, col = self.get_row_col_from_mouse(pos)
-                             if row is not None and col is not None:
-                                 self.game.move(end=(row, col))
-            
-            # Dibujando
-            self.draw_panel()
-            self.draw_board()
+                event = pygame.event.wait(timeout)
 
-            if game_over:
-                self.draw_game_over(winner)
+            if event.type == pygame.QUIT:
+                self.running = False
 
-            pygame.display.update()
+            elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                # La ventana se volvió a mostrar: repintar todo
+                self.invalidate()
+
+            elif event.type == AI_RESULT:
+                self.on_ai_result()
+
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_s:
+                self.toggle_stats()
+
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                self.toggle_hints()
+
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_t:
+                self.toggle_turbo()
+
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_b and self.state == 'START':
+                # Siguiente tamaño de tablero
+                self.board_size = BOARD_SIZES[(BOARD_SIZES.index(self.board_size) + 1) % len(BOARD_SIZES)]
+                self.start_buttons = None
+
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                self.on_click(event.pos)
+
+            # Limita la frecuencia de repintado si llegan muchos eventos seguidos
+            self.clock.tick(FPS)
 
+        if self.worker is not None:
+            self.worker.stop()
+        if self.cache is not None:
+            self.cache.close()
         pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
-    gui = GUI()
+    parser = argparse.ArgumentParser(description="Smart Horses")
+    parser.add_argument('--turbo', action='store_true', help="no pauses between turns (T toggles it)")
+    for name, ms in PHASE_MS.items():
+        parser.add_argument(f'--{name}-ms', type=int, default=ms, help=f"duration of the '{name}' phase")
+    parser.add_argument('--weights', help="evaluation weights file for the AI (see tune.py)")
+    args = parser.parse_args()
+    try:
+        weights = load_weights(args.weights) if args.weights else None
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    gui = GUI({name: getattr(args, f'{name}_ms') for name in PHASE_MS}, turbo=args.turbo, weights=weights)
     gui.run()
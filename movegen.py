@@ -0,0 +1,85 @@
+from constants import *
+
+# Generación de movimientos del caballo.
+# Las tablas de vecinos se construyen una sola vez por tamaño de tablero:
+# para cada casilla, sus destinos en forma de L como lista y como máscara.
+# Las casillas se numeran como fila * columnas + columna.
+
+# Movimientos del Caballo: Forma de L
+# (fila +/- 2, col +/- 1) y (fila +/- 1, col +/- 2)
+KNIGHT_OFFSETS = [
+    (-2, -1), (-2, 1),
+    (-1, -2), (-1, 2),
+    (1, -2), (1, 2),
+    (2, -1), (2, 1)
+]
+
+
+class Geometry:
+    # Tablas de movimientos para un tamaño de tablero. Las máscaras son enteros
+    # de Python de ancho arbitrario, así que sirven igual para 8x8 que para 32x32.
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        self.full = (1 << self.size) - 1
+        self.targets, self.masks = self._build_tables()
+
+    def square(self, row, col):
+        return row * self.cols + col
+
+    def row_col(self, sq):
+        return divmod(sq, self.cols)
+
+    def _build_tables(self):
+        targets = []
+        masks = []
+        for row in range(self.rows):
+            for col in range(self.cols):
+                squares = []
+                for dx, dy in KNIGHT_OFFSETS:
+                    x, y = row + dx, col + dy
+                    if 0 <= x < self.rows and 0 <= y < self.cols:
+                        squares.append(self.square(x, y))
+                targets.append(squares)
+                mask = 0
+                for sq in squares:
+                    mask |= 1 << sq
+                masks.append(mask)
+        return targets, masks
+
+    def legal_moves_mask(self, sq, blocked):
+        # blocked: casillas destruidas u ocupadas por un caballo
+        return self.masks[sq] & ~blocked
+
+    def count_moves(self, sq, blocked):
+        return (self.masks[sq] & ~blocked).bit_count()
+
+    def legal_moves(self, sq, blocked):
+        return squares_of(self.masks[sq] & ~blocked)
+
+
+# Una sola Geometry por tamaño, compartida por todos los tableros de ese tamaño
+_geometries = {}
+
+
+def geometry(rows=ROWS, cols=COLS):
+    geo = _geometries.get((rows, cols))
+    if geo is None:
+        geo = _geometries[(rows, cols)] = Geometry(rows, cols)
+    return geo
+
+
+# Tablero estándar de 8x8
+DEFAULT_GEOMETRY = geometry()
+
+
+def squares_of(mask):
+    # Casillas de una máscara en orden creciente, que coincide con el orden
+    # de KNIGHT_OFFSETS para los destinos de una misma casilla
+    squares = []
+    while mask:
+        low = mask & -mask
+        squares.append(low.bit_length() - 1)
+        mask ^= low
+    return squares
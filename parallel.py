@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from state import WHITE
+from weights import make_weights
+
+# Búsqueda paralela en la raíz: cada movimiento de la raíz se busca completo
+# (ventana infinita) en un proceso del pool, así su valor es exacto y la
+# elección coincide con la búsqueda serial a la misma profundidad.
+# El pool se crea una sola vez y se reutiliza entre jugadas.
+
+_pool = None
+_pool_workers = 0
+
+# Motor de búsqueda de cada proceso del pool; su tabla de transposiciones
+# sigue viva entre jugadas
+_engine = None
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def get_pool(workers=None):
+    global _pool, _pool_workers
+    workers = workers or default_workers()
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_pool():
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+    _pool = None
+    _pool_workers = 0
+
+
+def _init_worker():
+    global _engine
+    from game import Game
+    _engine = Game()
+
+
+def _search_root_move(state, move, depth, weights):
+    # Valor exacto de un movimiento de la raíz
+    if _engine.weights != weights:
+        _engine.set_weights(weights)
+    _engine.tt.new_search()
+    _engine.fit_board(state)
+    _engine.killers = [[None, None] for _ in range(depth + 1)]
+    state.make_move(move)
+    value, _ = _engine.minimax(state, depth - 1, state.turn == WHITE, ply=1)
+    return value
+
+
+def parallel_search(game_state, depth, workers=None, weights=None):
+    # Devuelve (valor, movimiento) como Game.minimax en la raíz; el caballo en
+    # turno debe tener al menos un movimiento (los pasos se buscan en serie)
+    moves = game_state.legal_moves(game_state.turn)
+    weights = make_weights(weights)
+    pool = get_pool(workers)
+    futures = [pool.submit(_search_root_move, game_state, move, depth, weights) for move in moves]
+    values = [future.result() for future in futures]
+
+    # Mismo desempate que la búsqueda serial: el primer movimiento con el mejor valor
+    if game_state.turn == WHITE:
+        best_value = max(values)
+    else:
+        best_value = min(values)
+    return best_value, moves[values.index(best_value)]
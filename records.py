@@ -0,0 +1,322 @@
+import os
+import random
+import struct
+import tempfile
+
+from constants import *
+from movegen import KNIGHT_OFFSETS
+from state import BoardState, WHITE, BLACK, charge_penalties
+from game import Game, PASS_BYTE, default_items
+from tt import ENTRY_BYTES
+
+# Formato binario compacto de partidas.
+#
+#   archivo:  MAGIC, versión y luego registros de partida uno tras otro
+#   partida:  filas u8, columnas u8, banderas u8, número de jugadas u16
+#             tablero inicial: semilla u64 (si la partida se creó con seed y los
+#                              elementos por defecto) o disposición explícita:
+#                              caballo blanco u16, negro u16, n u16 y n x (casilla u16, valor i8)
+#             un byte por jugada: bando << 3 | índice en KNIGHT_OFFSETS,
+#                              o PASS_BYTE | bando para un paso
+#             puntajes finales i32 blanco, i32 negro
+#
+# La casilla de origen no se guarda: es la posición del caballo en turno al
+# reproducir la partida, así cada jugada cabe en un byte para cualquier tamaño.
+# Escritura y lectura son en flujo: nunca se carga el archivo completo.
+
+MAGIC = b'SHGR'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sB')
+GAME_HEADER = struct.Struct('<BBBH')
+SEED = struct.Struct('<Q')
+LAYOUT = struct.Struct('<HHH')
+ITEM = struct.Struct('<Hb')
+SCORES = struct.Struct('<ii')
+
+# Banderas de GAME_HEADER
+SEEDED = 1
+
+
+class GameRecord:
+    def __init__(self, rows, cols, moves, white_score, black_score, seed=None, layout=None, offset=None):
+        self.rows = rows
+        self.cols = cols
+        # Semilla de Game o (blanco, negro, [(casilla, valor), ...])
+        self.seed = seed
+        self.layout = layout
+        self.moves = moves
+        self.white_score = white_score
+        self.black_score = black_score
+        # Posición del registro en el archivo (ver read_record_at)
+        self.offset = offset
+
+    @classmethod
+    def from_game(cls, game):
+        if isinstance(game.seed, int) and 0 <= game.seed < 1 << 64 and \
+                game.items == default_items(game.rows, game.cols):
+            seed, layout = game.seed, None
+        else:
+            seed, layout = None, board_layout(game.initial_board, game.geo)
+        return cls(game.rows, game.cols, bytes(game.move_log),
+                   game.white_horse.score, game.black_horse.score, seed, layout)
+
+    def __len__(self):
+        return len(self.moves)
+
+    def encode(self):
+        flags = SEEDED if self.seed is not None else 0
+        parts = [GAME_HEADER.pack(self.rows, self.cols, flags, len(self.moves))]
+        if self.seed is not None:
+            parts.append(SEED.pack(self.seed))
+        else:
+            white, black, items = self.layout
+            parts.append(LAYOUT.pack(white, black, len(items)))
+            parts.extend(ITEM.pack(sq, value) for sq, value in items)
+        parts.append(self.moves)
+        parts.append(SCORES.pack(self.white_score, self.black_score))
+        return b''.join(parts)
+
+    # REPRODUCCIÓN
+    def initial_game(self, **kwargs):
+        # Game en el tablero inicial; kwargs se pasan a Game (dificultad, etc.)
+        kwargs.setdefault('tt_max_bytes', 2 * ENTRY_BYTES)
+        if self.seed is not None:
+            return Game(seed=self.seed, rows=self.rows, cols=self.cols, **kwargs)
+
+        white, black, items = self.layout
+        game = Game(rows=self.rows, cols=self.cols, items=[value for _, value in items], **kwargs)
+        board = [[0 for _ in range(self.cols)] for _ in range(self.rows)]
+        for sq, value in items:
+            r, c = game.geo.row_col(sq)
+            board[r][c] = value
+        for sq, name in ((white, 'WH'), (black, 'BH')):
+            r, c = game.geo.row_col(sq)
+            board[r][c] = name
+        game.board = board
+        game.initial_board = [row[:] for row in board]
+        game.set_horse_position()
+        return game
+
+    def states(self, copy=True):
+        # (BoardState, penalizaciones) tras cada ply, el primero es el tablero
+        # inicial; con copy=False se devuelve siempre el mismo estado modificado
+        state = BoardState.from_game(self.initial_game())
+        penalized = [False, False]
+        charge_penalties(state, penalized)
+        yield (state.copy() if copy else state), tuple(penalized)
+
+        geo = state.geo
+        for byte in self.moves:
+            side = byte & 1 if byte & PASS_BYTE else byte >> 3 & 1
+            if side != state.turn:
+                raise ValueError("corrupt game record: move by the side not on turn")
+            if byte & PASS_BYTE:
+                state.pass_turn()
+            else:
+                dr, dc = KNIGHT_OFFSETS[byte & 7]
+                row, col = geo.row_col(state.white if side == WHITE else state.black)
+                state.make_move(geo.square(row + dr, col + dc))
+            charge_penalties(state, penalized)
+            yield (state.copy() if copy else state), tuple(penalized)
+
+    def replay(self, ply=None, **kwargs):
+        # Game en el estado tras `ply` jugadas (por defecto el final de la partida)
+        if ply is None:
+            ply = len(self.moves)
+        if not 0 <= ply <= len(self.moves):
+            raise ValueError(f"ply {ply} out of range 0..{len(self.moves)}")
+        for i, (state, penalized) in enumerate(self.states(copy=False)):
+            if i == ply:
+                break
+        game = self.initial_game(**kwargs)
+        state.apply_to(game)
+        game.white_horse_penality, game.black_horse_penality = penalized
+        game.move_log = bytearray(self.moves[:ply])
+        return game
+
+
+def board_layout(board, geo):
+    # (blanco, negro, [(casilla, valor), ...]) de un tablero de Game
+    white = black = None
+    items = []
+    for r, row in enumerate(board):
+        for c, piece in enumerate(row):
+            if piece == 'WH':
+                white = geo.square(r, c)
+            elif piece == 'BH':
+                black = geo.square(r, c)
+            elif piece != 0 and piece != DESTROYED:
+                items.append((geo.square(r, c), piece))
+    return white, black, items
+
+
+# ESCRITURA Y LECTURA EN FLUJO
+class RecordWriter:
+    def __init__(self, path, append=False):
+        self.file = open(path, 'ab' if append else 'wb')
+        if self.file.tell() == 0:
+            self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        self.count = 0
+
+    def write(self, game_or_record):
+        record = game_or_record if isinstance(game_or_record, GameRecord) else GameRecord.from_game(game_or_record)
+        self.file.write(record.encode())
+        self.count += 1
+
+    def write_bytes(self, data):
+        # Registro ya codificado (p. ej. devuelto por un proceso de simulate)
+        self.file.write(data)
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _check_header(f):
+    data = f.read(FILE_HEADER.size)
+    if len(data) < FILE_HEADER.size:
+        raise ValueError("not a game record file")
+    magic, version = FILE_HEADER.unpack(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a game record file (version {VERSION})")
+
+
+def _read_exact(f, n):
+    data = f.read(n)
+    if len(data) != n:
+        raise ValueError("truncated game record")
+    return data
+
+
+def _read_record(f, skip_moves=False):
+    # Lee el registro en la posición actual; None al final del archivo
+    offset = f.tell()
+    data = f.read(GAME_HEADER.size)
+    if not data:
+        return None
+    if len(data) != GAME_HEADER.size:
+        raise ValueError("truncated game record")
+    rows, cols, flags, count = GAME_HEADER.unpack(data)
+
+    seed = layout = None
+    if flags & SEEDED:
+        seed, = SEED.unpack(_read_exact(f, SEED.size))
+    else:
+        white, black, n = LAYOUT.unpack(_read_exact(f, LAYOUT.size))
+        raw = _read_exact(f, n * ITEM.size)
+        layout = (white, black, [ITEM.unpack_from(raw, i * ITEM.size) for i in range(n)])
+
+    if skip_moves:
+        f.seek(count, 1)
+        moves = None
+    else:
+        moves = _read_exact(f, count)
+    white_score, black_score = SCORES.unpack(_read_exact(f, SCORES.size))
+    record = GameRecord(rows, cols, moves, white_score, black_score, seed, layout, offset)
+    if skip_moves:
+        record.length = count
+    return record
+
+
+def read_records(path):
+    # Genera los registros del archivo uno a uno
+    with open(path, 'rb') as f:
+        _check_header(f)
+        while True:
+            record = _read_record(f)
+            if record is None:
+                return
+            yield record
+
+
+def index_records(path):
+    # Índice del archivo sin leer las jugadas: (posición, jugadas, puntaje blanco, puntaje negro)
+    with open(path, 'rb') as f:
+        _check_header(f)
+        while True:
+            record = _read_record(f, skip_moves=True)
+            if record is None:
+                return
+            yield record.offset, record.length, record.white_score, record.black_score
+
+
+def read_record_at(path, offset):
+    with open(path, 'rb') as f:
+        _check_header(f)
+        f.seek(offset)
+        return _read_record(f)
+
+
+# VERIFICACIÓN
+def _random_game(seed, rows=ROWS, cols=COLS, items=None, layout_only=False):
+    # Partida aleatoria con las reglas de la GUI (penalización única y pasos)
+    rng = random.Random(seed)
+    # Sin semilla el registro debe guardar la disposición explícita
+    game = Game(seed=None if layout_only else seed, rows=rows, cols=cols, items=items,
+                tt_max_bytes=2 * ENTRY_BYTES)
+    snapshots = []
+    while True:
+        over = game.game_over()
+        snapshots.append(([row[:] for row in game.board], game.white_horse.score, game.black_horse.score,
+                          game.turn.name))
+        if over:
+            return game, snapshots
+        moves = game.get_valid_moves()
+        if not moves:
+            game.pass_turn()
+        else:
+            game.move(rng.choice(moves))
+
+
+def check_records(games=60, seed=0):
+    boards = [(ROWS, COLS, None, False), (ROWS, COLS, [10, -10, 1], False), (12, 12, None, False),
+              (ROWS, COLS, None, True)]
+    played = []
+    fd, path = tempfile.mkstemp(suffix='.shgr')
+    os.close(fd)
+    try:
+        with RecordWriter(path) as writer:
+            for i in range(games):
+                rows, cols, items, layout_only = boards[i % len(boards)]
+                game, snapshots = _random_game(seed + i, rows, cols, items, layout_only)
+                writer.write(game)
+                played.append((game, snapshots))
+
+        records = list(read_records(path))
+        assert len(records) == len(played), "número de registros incorrecto"
+        for record, (game, snapshots) in zip(records, played):
+            assert (record.seed is None) == (game.seed is None or game.items != default_items(game.rows, game.cols))
+            assert len(record) == len(snapshots) - 1 == len(game.move_log)
+            for (state, penalized), (board, white_score, black_score, turn) in zip(record.states(), snapshots):
+                assert state.to_board() == board, "tablero reproducido incorrecto"
+                assert (state.white_score, state.black_score) == (white_score, black_score), "puntajes incorrectos"
+                assert state.turn == (WHITE if turn == 'WH' else BLACK)
+                assert state.zobrist == state.compute_zobrist(), "hash Zobrist incorrecto"
+            assert (record.white_score, record.black_score) == (game.white_horse.score, game.black_horse.score)
+
+            # Estado intermedio completo como Game
+            ply = len(record) // 2
+            middle = record.replay(ply)
+            board, white_score, black_score, turn = snapshots[ply]
+            assert middle.board == board and middle.turn.name == turn
+            assert (middle.white_horse.score, middle.black_horse.score) == (white_score, black_score)
+            assert middle.move_log == game.move_log[:ply]
+
+        index = list(index_records(path))
+        assert [entry[0] for entry in index] == [record.offset for record in records]
+        for offset, length, white_score, black_score in index[::7]:
+            record = read_record_at(path, offset)
+            assert len(record) == length and (record.white_score, record.black_score) == (white_score, black_score)
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    check_records()
+    print("records OK")
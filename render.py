@@ -0,0 +1,138 @@
+import pygame
+from settings import *
+
+# Dibujo del tablero por capas con cachés.
+#   - El tablero de ajedrez vacío se pinta una sola vez en una superficie.
+#   - Los textos (valores de casillas, nombres de caballos) se renderizan una vez por texto.
+#   - Las superficies de resaltado se crean una sola vez.
+#   - Cada casilla recuerda lo que se dibujó; solo se repintan las que cambian y
+#     se devuelven sus rectángulos para pygame.display.update(rects).
+# Tableros mayores que 8x8 se escalan para caber en el área del tablero
+# (BOARD_WIDTH x BOARD_HEIGHT): casillas, imágenes y fuentes más pequeñas.
+
+# Transparencia de los resaltados
+HIGHLIGHT_ALPHA = 128
+TARGET_ALPHA = 180
+COLOR_TARGET = (255, 0, 0)
+
+
+class BoardRenderer:
+    def __init__(self, screen, images, font, small_font, rows=ROWS, cols=COLS):
+        self.screen = screen
+        self.rows = rows
+        self.cols = cols
+
+        # Vista: casillas cuadradas lo más grandes posible, tablero centrado
+        self.tile = min(BOARD_WIDTH // cols, BOARD_HEIGHT // rows)
+        self.left = (BOARD_WIDTH - self.tile * cols) // 2
+        self.top = PANEL_HEIGHT + (BOARD_HEIGHT - self.tile * rows) // 2
+        self.area = pygame.Rect(0, PANEL_HEIGHT, BOARD_WIDTH, BOARD_HEIGHT)
+
+        if self.tile == TILE_SIZE:
+            self.font = font
+            self.small_font = small_font
+        else:
+            self.font = pygame.font.SysFont('Arial', max(8, 32 * self.tile // TILE_SIZE), bold=True)
+            self.small_font = pygame.font.SysFont('Arial', max(8, 20 * self.tile // TILE_SIZE))
+        self.assets = {name: pygame.transform.scale(image, (self.tile, self.tile))
+                       for name, image in images.items()}
+
+        # Capa estática: tablero de ajedrez vacío
+        self.background = pygame.Surface((self.tile * cols, self.tile * rows))
+        for row in range(rows):
+            for col in range(cols):
+                color = COLOR_BOARD_LIGHT if (row + col) % 2 == 0 else COLOR_BOARD_DARK
+                pygame.draw.rect(self.background, color, (col * self.tile, row * self.tile, self.tile, self.tile))
+
+        self.move_overlay = self._overlay(COLOR_HIGHLIGHT, HIGHLIGHT_ALPHA)
+        self.target_overlay = self._overlay(COLOR_TARGET, TARGET_ALPHA)
+        # (texto, fuente, color) -> superficie
+        self.glyphs = {}
+        # (fila, col) -> lo último que se dibujó en esa casilla
+        self.cells = {}
+
+    def _overlay(self, color, alpha):
+        surface = pygame.Surface((self.tile, self.tile))
+        surface.set_alpha(alpha)
+        surface.fill(color)
+        return surface
+
+    def glyph(self, text, font, color):
+        key = (text, id(font), color)
+        surface = self.glyphs.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self.glyphs[key] = surface
+        return surface
+
+    def rect(self, row, col):
+        # Casilla en coordenadas de pantalla (debajo del panel)
+        return pygame.Rect(self.left + col * self.tile, self.top + row * self.tile, self.tile, self.tile)
+
+    def square_at(self, pos):
+        # Casilla bajo el punto de pantalla, o (None, None) fuera del tablero
+        x, y = pos[0] - self.left, pos[1] - self.top
+        if not (0 <= x < self.tile * self.cols and 0 <= y < self.tile * self.rows):
+            return None, None
+        return y // self.tile, x // self.tile
+
+    def invalidate(self):
+        # La pantalla se pintó por encima (inicio, fin de partida): repintar todo
+        self.cells = {}
+
+    def draw(self, board, valid_moves, target, hints=None):
+        # Dibuja las casillas que cambiaron y devuelve sus rectángulos.
+        # hints: (fila, col) -> texto del valor de la jugada (análisis de la tecla H)
+        dirty = []
+        if not self.cells:
+            # Repintado completo: también el margen alrededor de un tablero escalado
+            pygame.draw.rect(self.screen, COLOR_PANEL, self.area)
+            dirty.append(self.area)
+        for row in range(self.rows):
+            for col in range(self.cols):
+                cell = (board[row][col], (row, col) in valid_moves, target == (row, col),
+                        hints.get((row, col)) if hints else None)
+                if self.cells.get((row, col)) == cell:
+                    continue
+                self.cells[(row, col)] = cell
+                dirty.append(self.draw_cell(row, col, *cell))
+        return dirty
+
+    def draw_cell(self, row, col, piece, is_move, is_target, hint=None):
+        rect = self.rect(row, col)
+        self.screen.blit(self.background, rect, (col * self.tile, row * self.tile, self.tile, self.tile))
+
+        # Dibujar Casilla Destruida
+        if piece == DESTROYED:
+            if 'destroy' in self.assets:
+                self.screen.blit(self.assets['destroy'], rect)
+            else:
+                # Visual alternativo
+                pygame.draw.rect(self.screen, (50, 50, 50), rect)
+
+        # Resaltado de movimiento válido y de objetivo de la IA
+        if is_move:
+            self.screen.blit(self.move_overlay, rect)
+        if is_target:
+            self.screen.blit(self.target_overlay, rect)
+
+        if piece not in [DESTROYED, 'WH', 'BH', 0]:
+            # Valor de la casilla
+            text = self.glyph(str(piece), self.small_font, (0, 0, 0))
+            self.screen.blit(text, text.get_rect(center=rect.center))
+
+        # Dibujar Pieza
+        if piece in ['WH', 'BH']:
+            if piece in self.assets:
+                self.screen.blit(self.assets[piece], rect)
+            else:
+                # Texto alternativo
+                text_color = (0, 0, 0) if piece == 'WH' else (50, 50, 50)
+                text = self.glyph(piece, self.font, text_color)
+                self.screen.blit(text, text.get_rect(center=rect.center))
+
+        # Valor de la jugada sugerida, en la esquina inferior derecha
+        if hint is not None:
+            text = self.glyph(hint, self.small_font, COLOR_HINT)
+            self.screen.blit(text, text.get_rect(bottomright=(rect.right - 2, rect.bottom)))
+        return rect
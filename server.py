@@ -0,0 +1,488 @@
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import os
+import resource
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from constants import *
+from game import Game, MAX_SEARCH_DEPTH
+from state import BoardState, WHITE, BLACK, PASS, charge_penalties
+
+# Servidor local de partidas: muchas sesiones a la vez, un pool de procesos
+# compartido para las jugadas de la IA.
+#
+# Protocolo: una petición JSON por línea y una respuesta JSON por línea con el
+# mismo "id"; las respuestas de una conexión pueden llegar en otro orden.
+#   {"id": 1, "op": "new", "difficulty": 4}          -> sesión nueva, la IA (blanco) abre
+#        opcionales: "engine" ("minimax"|"mcts"), "time_ms", "iterations",
+#                    "size" o "rows"/"cols", "seed"
+#   {"id": 2, "op": "move", "session": "s1", "to": [r, c]}  -> jugada del jugador (negro)
+#                                                     y respuesta de la IA
+#   {"id": 3, "op": "state", "session": "s1"}         -> estado con el tablero completo
+#   {"id": 4, "op": "close", "session": "s1"}
+#   {"id": 5, "op": "stats"}                          -> contadores del servidor
+# Los errores se responden con {"id": ..., "ok": false, "error": "..."}; "busy"
+# y "overloaded" indican que conviene reintentar más tarde: una petición
+# rechazada no cambia la sesión ni la crea.
+#
+# Una sesión es solo un BoardState y unos pocos campos (unos cientos de bytes),
+# así miles de sesiones inactivas ocupan poca memoria. Las búsquedas corren en
+# los procesos del pool, nunca en el bucle de eventos; cada proceso tiene un
+# único motor Game (y su tabla de transposiciones) para todas las sesiones.
+# El reparto es por turnos entre conexiones (FairScheduler) y la cola tiene
+# un límite: una conexión con demasiadas peticiones en curso deja de leerse.
+#
+#   python server.py --port 8765 --workers 4
+#   python server.py --unix /tmp/smart_horses.sock
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Jugadas de IA esperando un proceso libre en todo el servidor
+MAX_PENDING = 1024
+# Peticiones sin responder por conexión antes de dejar de leerla
+MAX_INFLIGHT = 32
+MAX_SESSIONS = 100000
+# Sesiones sin actividad durante este tiempo se descartan
+IDLE_TIMEOUT_S = 3600
+MAX_LINE_BYTES = 64 * 1024
+MAX_BOARD_SIZE = 64
+
+
+class RequestError(Exception):
+    pass
+
+
+class Overloaded(RequestError):
+    def __init__(self):
+        super().__init__("overloaded")
+
+
+# PROCESOS DEL POOL
+# Motores de este proceso: 'minimax' y 'mcts' se crean al primer uso
+_engines = {}
+
+
+def ai_move(state, engine, difficulty, time_ms, iterations):
+    # Jugada de la IA para el caballo en turno (se ejecuta en un proceso del pool)
+    game = _engines.get(engine)
+    if game is None:
+        game = _engines[engine] = Game(engine=engine)
+    game.difficulty = difficulty
+    game.time_budget_ms = time_ms
+    if game.mcts is not None:
+        # El motor es compartido: cada sesión usa las suyas o las por defecto
+        from mcts import MCTS_ITERATIONS
+        game.mcts.iterations = iterations or MCTS_ITERATIONS
+    return game.search(state)
+
+
+class FairScheduler:
+    # Reparte trabajos entre `workers` procesos por turnos entre dueños
+    # (conexiones): cada dueño tiene su cola FIFO y ninguno acapara el pool.
+    def __init__(self, executor, workers, max_pending=MAX_PENDING):
+        self.executor = executor
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queues = {}
+        self.ring = collections.deque()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+
+    def admit(self):
+        # Se llama antes de modificar la sesión: las jugadas de IA de una
+        # petición admitida se encolan aunque la cola se llene después, así
+        # una petición nunca queda a medias
+        if self.pending >= self.max_pending:
+            raise Overloaded()
+
+    async def submit(self, owner, fn, *args):
+        future = asyncio.get_running_loop().create_future()
+        queue = self.queues.get(owner)
+        if queue is None:
+            queue = self.queues[owner] = collections.deque()
+            self.ring.append(owner)
+        queue.append((future, fn, args))
+        self.pending += 1
+        self._dispatch()
+        return await future
+
+    def cancel(self, owner):
+        # Descarta los trabajos en cola de un dueño (conexión cerrada)
+        queue = self.queues.pop(owner, None)
+        if queue is None:
+            return
+        self.ring.remove(owner)
+        for future, _, _ in queue:
+            future.cancel()
+        self.pending -= len(queue)
+
+    def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while self.running < self.workers and self.ring:
+            owner = self.ring.popleft()
+            queue = self.queues[owner]
+            future, fn, args = queue.popleft()
+            if queue:
+                self.ring.append(owner)
+            else:
+                del self.queues[owner]
+            self.pending -= 1
+            if future.cancelled():
+                continue
+            self.running += 1
+            job = loop.run_in_executor(self.executor, fn, *args)
+            job.add_done_callback(lambda job, future=future: self._finished(job, future))
+
+    def _finished(self, job, future):
+        self.running -= 1
+        self.completed += 1
+        if job.cancelled():
+            future.cancel()
+        elif not future.cancelled():
+            if job.exception() is not None:
+                future.set_exception(job.exception())
+            else:
+                future.set_result(job.result())
+        self._dispatch()
+
+
+class Session:
+    # Partida del servidor: la IA juega con blanco y el cliente con negro, con
+    # las reglas de GUI.run (penalización única, paso del caballo sin jugadas)
+    __slots__ = ('id', 'state', 'penalized', 'engine', 'difficulty', 'time_ms', 'iterations',
+                 'busy', 'touched')
+
+    def __init__(self, session_id, state, engine, difficulty, time_ms, iterations):
+        self.id = session_id
+        self.state = state
+        self.penalized = [False, False]
+        self.engine = engine
+        self.difficulty = difficulty
+        self.time_ms = time_ms
+        self.iterations = iterations
+        # Hay una jugada de la IA en curso; la sesión no acepta otra petición
+        self.busy = False
+        self.touched = time.monotonic()
+        charge_penalties(self.state, self.penalized)
+
+    def over(self):
+        return self.state.white_mobility == 0 and self.state.black_mobility == 0
+
+    def play(self, move):
+        state = self.state
+        if move == PASS:
+            state.pass_turn()
+        else:
+            state.make_move(move)
+        charge_penalties(state, self.penalized)
+
+    def winner(self):
+        state = self.state
+        if state.white_score > state.black_score:
+            return 'WH'
+        if state.black_score > state.white_score:
+            return 'BH'
+        return None
+
+    def describe(self, board=False):
+        state = self.state
+        geo = state.geo
+        info = {
+            'session': self.id,
+            'white': geo.row_col(state.white),
+            'black': geo.row_col(state.black),
+            'scores': [state.white_score, state.black_score],
+            'turn': 'WH' if state.turn == WHITE else 'BH',
+            'moves': [geo.row_col(sq) for sq in state.legal_moves(BLACK)] if state.turn == BLACK else [],
+            'over': self.over(),
+            'winner': self.winner() if self.over() else None,
+        }
+        if board:
+            info['board'] = state.to_board()
+        return info
+
+
+class GameServer:
+    def __init__(self, workers=None, max_pending=MAX_PENDING, max_inflight=MAX_INFLIGHT,
+                 max_sessions=MAX_SESSIONS, idle_timeout=IDLE_TIMEOUT_S):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.scheduler = FairScheduler(self.executor, self.workers, max_pending)
+        self.max_inflight = max_inflight
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self.ids = itertools.count(1)
+        self.connections = 0
+        self.requests = 0
+        self.server = None
+
+    # CONEXIONES
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None):
+        if unix is not None:
+            self.server = await asyncio.start_unix_server(self.handle, unix, limit=MAX_LINE_BYTES)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port, limit=MAX_LINE_BYTES)
+        asyncio.get_running_loop().create_task(self._sweep())
+        return self.server
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.executor.shutdown(cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        owner = object()
+        slots = asyncio.Semaphore(self.max_inflight)
+        tasks = set()
+        lock = asyncio.Lock()
+        try:
+            while True:
+                # Contrapresión: sin cupo no se lee la siguiente línea
+                await slots.acquire()
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                task = asyncio.get_running_loop().create_task(self._respond(owner, line, writer, lock, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            # Cliente desconectado: sus jugadas de IA en cola no se buscan y
+            # sus peticiones en curso se abandonan (nadie leería la respuesta)
+            self.scheduler.cancel(owner)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            self.scheduler.cancel(owner)
+            self.connections -= 1
+            writer.close()
+
+    async def _respond(self, owner, line, writer, lock, slots):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("request must be a JSON object")
+            request_id = request.get('id')
+            response = await self.dispatch(owner, request)
+            response['ok'] = True
+        except json.JSONDecodeError:
+            response = {'ok': False, 'error': "invalid JSON"}
+        except RequestError as e:
+            response = {'ok': False, 'error': str(e)}
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            response = {'ok': False, 'error': f"internal error: {e}"}
+        finally:
+            slots.release()
+        response['id'] = request_id
+        async with lock:
+            try:
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    # PETICIONES
+    async def dispatch(self, owner, request):
+        self.requests += 1
+        op = request.get('op')
+        if op == 'new':
+            return await self.new_session(owner, request)
+        if op == 'stats':
+            return self.stats()
+
+        session = self.sessions.get(request.get('session'))
+        if session is None:
+            raise RequestError("unknown session")
+        session.touched = time.monotonic()
+        if op == 'state':
+            ai_moves = await self._resume_ai(owner, session)
+            info = session.describe(board=True)
+            if ai_moves:
+                info['ai_moves'] = ai_moves
+            return info
+        if op == 'close':
+            del self.sessions[session.id]
+            return {'session': session.id}
+        if op == 'move':
+            return await self.player_move(owner, session, request.get('to'))
+        raise RequestError(f"unknown op: {op!r}")
+
+    async def new_session(self, owner, request):
+        if len(self.sessions) >= self.max_sessions:
+            raise Overloaded()
+        engine = request.get('engine', 'minimax')
+        if engine not in ('minimax', 'mcts'):
+            raise RequestError(f"unknown engine: {engine!r}")
+        difficulty = _int(request, 'difficulty', 4, 1, MAX_SEARCH_DEPTH)
+        time_ms = request.get('time_ms')
+        if time_ms is not None:
+            time_ms = _int(request, 'time_ms', None, 1, 60000)
+            if engine == 'minimax':
+                difficulty = MAX_SEARCH_DEPTH
+        iterations = request.get('iterations')
+        if iterations is not None:
+            iterations = _int(request, 'iterations', None, 1, 10 ** 6)
+        size = request.get('size')
+        rows = _int(request, 'rows', size if size is not None else ROWS, 4, MAX_BOARD_SIZE)
+        cols = _int(request, 'cols', size if size is not None else COLS, 4, MAX_BOARD_SIZE)
+        seed = request.get('seed')
+        if seed is not None and not isinstance(seed, int):
+            raise RequestError("seed must be an integer")
+
+        try:
+            game = Game(seed=seed, rows=rows, cols=cols, tt_max_bytes=1, endgame_squares=0)
+        except ValueError as e:
+            raise RequestError(str(e))
+        self.scheduler.admit()
+        session = Session(f"s{next(self.ids)}", BoardState.from_game(game), engine, difficulty,
+                          time_ms, iterations)
+        self.sessions[session.id] = session
+        try:
+            ai_moves = await self._ai_turns(owner, session)
+        except BaseException:
+            # Sin la apertura de la IA la sesión no sirve: no debe ocupar cupo
+            self.sessions.pop(session.id, None)
+            raise
+        info = session.describe(board=True)
+        info['ai_moves'] = ai_moves
+        return info
+
+    async def player_move(self, owner, session, target):
+        if session.busy:
+            raise RequestError("busy")
+        ai_moves = await self._resume_ai(owner, session)
+        state = session.state
+        if session.over():
+            raise RequestError("game over")
+        if state.turn != BLACK:
+            raise RequestError("not your turn")
+        if (not isinstance(target, list) or len(target) != 2
+                or not all(isinstance(x, int) for x in target)):
+            raise RequestError("'to' must be [row, col]")
+        geo = state.geo
+        row, col = target
+        if not (0 <= row < geo.rows and 0 <= col < geo.cols) or \
+                geo.square(row, col) not in state.legal_moves(BLACK):
+            raise RequestError("illegal move")
+
+        self.scheduler.admit()
+        session.play(geo.square(row, col))
+        ai_moves += await self._ai_turns(owner, session)
+        info = session.describe()
+        info['ai_moves'] = ai_moves
+        return info
+
+    async def _resume_ai(self, owner, session):
+        # Turno de la IA que quedó sin jugar (su búsqueda falló): se retoma
+        if session.busy or session.over() or session.state.turn != WHITE:
+            return []
+        self.scheduler.admit()
+        return await self._ai_turns(owner, session)
+
+    async def _ai_turns(self, owner, session):
+        # Juega la IA (y los pasos de ambos) hasta que el jugador pueda mover
+        # o la partida termine. Devuelve las jugadas de la IA ("pass" si pasó).
+        ai_moves = []
+        state = session.state
+        session.busy = True
+        try:
+            while not session.over():
+                if not state.legal_moves(state.turn):
+                    if state.turn == WHITE:
+                        ai_moves.append('pass')
+                    session.play(PASS)
+                    continue
+                if state.turn == BLACK:
+                    break
+                move = await self.scheduler.submit(owner, ai_move, state.copy(), session.engine,
+                                                   session.difficulty, session.time_ms, session.iterations)
+                if self.sessions.get(session.id) is not session:
+                    # Cerrada mientras la IA pensaba
+                    break
+                if move is None:
+                    # No debería pasar (el caballo en turno tiene jugadas); el
+                    # turno queda pendiente y la siguiente petición lo retoma
+                    raise RequestError("the AI returned no move")
+                session.play(move)
+                ai_moves.append(state.geo.row_col(move))
+        finally:
+            session.busy = False
+        return ai_moves
+
+    def stats(self):
+        scheduler = self.scheduler
+        return {
+            'sessions': len(self.sessions),
+            'connections': self.connections,
+            'requests': self.requests,
+            'pending': scheduler.pending,
+            'running': scheduler.running,
+            'completed': scheduler.completed,
+            'workers': self.workers,
+            # Memoria máxima del proceso del servidor (KiB en Linux)
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+    async def _sweep(self):
+        # Descarta las sesiones inactivas
+        while True:
+            await asyncio.sleep(min(60, self.idle_timeout))
+            limit = time.monotonic() - self.idle_timeout
+            for session_id in [s.id for s in self.sessions.values() if s.touched < limit and not s.busy]:
+                del self.sessions[session_id]
+
+
+def _int(request, name, default, low, high):
+    value = request.get(name, default)
+    if not isinstance(value, int) or isinstance(value, bool) or not low <= value <= high:
+        raise RequestError(f"{name} must be an integer in {low}..{high}")
+    return value
+
+
+async def run_server(args):
+    server = GameServer(args.workers, args.max_pending, args.max_inflight)
+    await server.serve(args.host, args.port, args.unix)
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"Smart Horses server on {where} with {server.workers} workers", flush=True)
+    # Cierre ordenado con Ctrl+C o SIGTERM: los procesos del pool terminan con el servidor
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Smart Horses game server (JSON lines)")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="AI worker processes")
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING, help="queued AI moves before 'overloaded'")
+    parser.add_argument('--max-inflight', type=int, default=MAX_INFLIGHT,
+                        help="unanswered requests per connection before it stops being read")
+    args = parser.parse_args(argv)
+    asyncio.run(run_server(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
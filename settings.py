@@ -1,14 +1,15 @@
-import pygame
+from constants import *
 
 # Dimensiones de la Pantalla
 TILE_SIZE = 64
-ROWS = 8
-COLS = 8
 BOARD_WIDTH = TILE_SIZE * COLS
 BOARD_HEIGHT = TILE_SIZE * ROWS
 PANEL_HEIGHT = 150
 SCREEN_WIDTH = BOARD_WIDTH
 SCREEN_HEIGHT = BOARD_HEIGHT + PANEL_HEIGHT
+# Tamaños de tablero elegibles en la pantalla de inicio; los mayores que 8x8
+# se escalan para caber en BOARD_WIDTH x BOARD_HEIGHT
+BOARD_SIZES = (8, 12, 16, 32)
 
 # Colores (Paleta Seria de Ajedrez)
 # Madera Clara / Beige
@@ -22,5 +23,17 @@ COLOR_PANEL = (50, 50, 50)
 # Color del texto (Blanco)
 COLOR_TEXT = (255, 255, 255)
 
+# Color de los valores de las jugadas sugeridas (tecla H)
+COLOR_HINT = (0, 0, 160)
+# Profundidad del análisis de las jugadas sugeridas
+HINT_DEPTH = 4
+
+# Duración (ms) de las fases de la interfaz; el modo turbo (--turbo o tecla T) las pone en 0
+PHASE_MS = {
+    'think': 500,    # "AI Thinking..." antes de pedir la jugada
+    'target': 1000,  # resaltado del destino de la IA antes de mover
+    'skip': 1500,    # aviso de turno sin movimientos antes de pasar
+}
+
 # Tasa de fotogramas
 FPS = 60
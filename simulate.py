@@ -0,0 +1,286 @@
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from game import Game, MAX_SEARCH_DEPTH
+from state import BoardState
+from cache import PositionCache
+from records import GameRecord, RecordWriter
+from weights import load_weights
+
+# Simulador sin interfaz gráfica: partidas IA contra IA sobre tableros
+# aleatorios con semilla, repartidas en un pool de procesos.
+#
+# Motores (blanco y negro se configuran por separado):
+#   minimax:D   búsqueda alfa-beta a profundidad fija D
+#   time:MS     profundización iterativa con MS milisegundos por jugada
+#   mcts:N      Monte Carlo (UCT) con N partidas simuladas por jugada
+#   random      movimiento legal al azar
+#
+# A los motores minimax y time se les puede añadir "@archivo" con pesos de
+# evaluación (ver weights.py y tune.py), p. ej. minimax:4@tuned.json.
+#
+# Ejemplo:
+#   python simulate.py --games 1000 --white minimax:4 --black time:100 --out results.jsonl
+#
+# Con --cache los motores minimax consultan (solo lectura) la caché de
+# posiciones precalculada con "python cache.py" para las mismas semillas.
+# Con --record las partidas se guardan en formato binario (ver records.py).
+
+FIELDS = ['game', 'seed', 'white', 'black', 'white_score', 'black_score', 'winner',
+          'moves', 'passes', 'white_ms', 'black_ms', 'white_max_ms', 'black_max_ms']
+
+
+def parse_engine(spec):
+    # Devuelve (tipo, argumento, archivo de pesos o None)
+    spec, _, weights = spec.partition('@')
+    kind, _, arg = spec.partition(':')
+    if weights and kind not in ('minimax', 'time'):
+        raise ValueError(f"Only minimax and time engines take a weights file: {spec!r}")
+    if kind == 'random':
+        return (kind, None, None)
+    if kind in ('minimax', 'time', 'mcts') and arg.isdigit():
+        return (kind, int(arg), weights or None)
+    raise ValueError(f"Unknown engine: {spec!r} (use minimax:D, time:MS, mcts:N or random)")
+
+
+class Engine:
+    # Jugador automático; cada uno tiene su propio Game como motor de búsqueda
+    # (tablas de transposiciones, killers e historial separados).
+    # weights (diccionario) tiene prioridad sobre el archivo de la especificación.
+    def __init__(self, spec, seed=None, cache=None, weights=None):
+        self.spec = spec
+        self.kind, self.arg, weights_path = parse_engine(spec)
+        if weights is None and weights_path:
+            weights = load_weights(weights_path)
+        if weights is not None:
+            # La caché de posiciones solo vale para la evaluación por defecto
+            cache = None
+        self.rng = random.Random(seed)
+        if self.kind == 'minimax':
+            self.searcher = Game(difficulty=self.arg, cache=cache, weights=weights)
+        elif self.kind == 'time':
+            self.searcher = Game(difficulty=MAX_SEARCH_DEPTH, time_budget_ms=self.arg, weights=weights)
+        elif self.kind == 'mcts':
+            # El árbol se conserva entre las jugadas de la partida
+            self.searcher = Game(engine='mcts', mcts_iterations=self.arg, seed=seed)
+        else:
+            self.searcher = None
+
+    def choose(self, game):
+        if self.searcher is None:
+            return self.rng.choice(game.get_valid_moves())
+        move = self.searcher.search(BoardState.from_game(game))
+        return game.geo.row_col(move)
+
+
+# Cachés de posiciones abiertas en este proceso: ruta -> PositionCache
+_caches = {}
+
+
+def open_cache(path):
+    if path not in _caches:
+        _caches[path] = PositionCache(path, readonly=True)
+    return _caches[path]
+
+
+def play_game(index, seed, white_spec, black_spec, cache_path=None, record=False,
+              white_weights=None, black_weights=None):
+    # Mismas reglas que GUI.run: penalización única al quedarse sin movimientos,
+    # el caballo sin jugadas cede el turno y la partida acaba cuando ninguno puede mover
+    game = Game(seed=seed)
+    cache = open_cache(cache_path) if cache_path else None
+    engines = {
+        game.white_horse.name: Engine(white_spec, seed, cache, white_weights),
+        game.black_horse.name: Engine(black_spec, seed + 1, cache, black_weights),
+    }
+    times = {game.white_horse.name: [], game.black_horse.name: []}
+    moves = 0
+    passes = 0
+
+    while not game.game_over():
+        if not game.get_valid_moves():
+            passes += 1
+            game.pass_turn()
+            continue
+
+        name = game.turn.name
+        start = time.perf_counter()
+        move = engines[name].choose(game)
+        times[name].append((time.perf_counter() - start) * 1000)
+        game.move(move)
+        moves += 1
+
+    def average(values):
+        return round(sum(values) / len(values), 3) if values else 0.0
+
+    result = {
+        'game': index,
+        'seed': seed,
+        'white': white_spec,
+        'black': black_spec,
+        'white_score': game.white_horse.score,
+        'black_score': game.black_horse.score,
+        'winner': game.check_winner(),
+        'moves': moves,
+        'passes': passes,
+        'white_ms': average(times['WH']),
+        'black_ms': average(times['BH']),
+        'white_max_ms': round(max(times['WH'], default=0.0), 3),
+        'black_max_ms': round(max(times['BH'], default=0.0), 3),
+    }
+    if record:
+        # Registro ya codificado; el proceso principal lo escribe en el archivo
+        result['record'] = GameRecord.from_game(game).encode()
+    return result
+
+
+def schedule(games, seed, white, black, swap):
+    # Con swap cada tablero se juega dos veces cambiando los colores
+    jobs = []
+    for i in range(games):
+        game_seed = seed + i
+        if swap:
+            jobs.append((2 * i, game_seed, white, black))
+            jobs.append((2 * i + 1, game_seed, black, white))
+        else:
+            jobs.append((i, game_seed, white, black))
+    return jobs
+
+
+class ResultWriter:
+    # Escribe cada resultado apenas llega, en JSONL o CSV según la extensión
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.csv = None
+        if path.endswith('.csv'):
+            self.csv = csv.DictWriter(self.file, fieldnames=FIELDS)
+            self.csv.writeheader()
+
+    def write(self, result):
+        if self.csv is not None:
+            self.csv.writerow(result)
+        else:
+            self.file.write(json.dumps(result) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def wilson_interval(successes, n, z=1.96):
+    # Intervalo de confianza de Wilson para una proporción
+    if n == 0:
+        return (0.0, 0.0)
+    p = successes / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return (max(0.0, center - margin), min(1.0, center + margin))
+
+
+def summarize(results, engine_a, engine_b):
+    # Resultados desde el punto de vista de engine_a (blancas sin swap)
+    n = len(results)
+    wins = draws = losses = 0
+    margin = 0
+    # Puntuación de torneo por partida: victoria 1, empate 0.5, derrota 0
+    points = []
+    for r in results:
+        a_is_white = r['white'] == engine_a
+        a_score = r['white_score'] if a_is_white else r['black_score']
+        b_score = r['black_score'] if a_is_white else r['white_score']
+        margin += a_score - b_score
+        if a_score > b_score:
+            wins += 1
+            points.append(1.0)
+        elif a_score < b_score:
+            losses += 1
+            points.append(0.0)
+        else:
+            draws += 1
+            points.append(0.5)
+
+    lines = [f"Games: {n}   {engine_a} vs {engine_b}"]
+    if n == 0:
+        return '\n'.join(lines)
+
+    for label, count in (('wins', wins), ('draws', draws), ('losses', losses)):
+        low, high = wilson_interval(count, n)
+        lines.append(f"  {engine_a} {label:<6} {count:>6}  {count / n:6.1%}  (95% CI {low:.1%} - {high:.1%})")
+
+    # Tasa de puntuación con intervalo normal
+    mean = sum(points) / n
+    var = sum((x - mean) ** 2 for x in points) / (n - 1) if n > 1 else 0.0
+    half = 1.96 * math.sqrt(var / n)
+    lines.append(f"  {engine_a} score rate {mean:.3f} +/- {half:.3f}   mean margin {margin / n:+.2f}")
+
+    moves = sum(r['moves'] for r in results)
+    lines.append(f"  moves per game {moves / n:.1f}")
+    return '\n'.join(lines)
+
+
+def run(games, seed, white, black, workers, out=None, swap=False, cache=None, record=None):
+    jobs = schedule(games, seed, white, black, swap)
+    writer = ResultWriter(out) if out else None
+    recorder = RecordWriter(record) if record else None
+    results = []
+    start = time.perf_counter()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(play_game, *job, cache, recorder is not None) for job in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                if recorder is not None:
+                    recorder.write_bytes(result.pop('record'))
+                results.append(result)
+                if writer is not None:
+                    writer.write(result)
+    finally:
+        if writer is not None:
+            writer.close()
+        if recorder is not None:
+            recorder.close()
+
+    elapsed = time.perf_counter() - start
+    results.sort(key=lambda r: r['game'])
+    return results, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Smart Horses self-play simulator")
+    parser.add_argument('--games', type=int, default=100, help="number of boards to play")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first board")
+    parser.add_argument('--white', default='minimax:4', help="white engine (minimax:D, time:MS, mcts:N, random; minimax/time take @weights.json)")
+    parser.add_argument('--black', default='minimax:2', help="black engine (minimax:D, time:MS, mcts:N, random; minimax/time take @weights.json)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--swap', action='store_true', help="also play every board with colours swapped")
+    parser.add_argument('--out', help="stream per-game results to a .jsonl or .csv file")
+    parser.add_argument('--cache', help="read-only position cache file (see cache.py)")
+    parser.add_argument('--record', help="write every game to a binary record file (see records.py)")
+    args = parser.parse_args(argv)
+
+    try:
+        for spec in (args.white, args.black):
+            weights_path = parse_engine(spec)[2]
+            if weights_path:
+                load_weights(weights_path)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    results, elapsed = run(args.games, args.seed, args.white, args.black,
+                           args.workers, args.out, args.swap, args.cache, args.record)
+    print(summarize(results, args.white, args.black))
+    print(f"  {len(results)} games in {elapsed:.1f} s ({len(results) / elapsed:.1f} games/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
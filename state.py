@@ -0,0 +1,387 @@
+import random
+from constants import *
+from movegen import DEFAULT_GEOMETRY, geometry, squares_of
+
+# Estado compacto del juego para la búsqueda.
+# Las casillas se numeran como fila * columnas + columna y cada conjunto de casillas
+# se guarda como una máscara de bits en un entero de Python (de cualquier ancho,
+# así el mismo código sirve para tableros mayores que 8x8; ver movegen.Geometry).
+
+WHITE = 0
+BLACK = 1
+
+# Movimiento de paso: el caballo sin movimientos cede el turno con penalización
+PASS = -1
+
+# HASH ZOBRIST
+MASK64 = (1 << 64) - 1
+
+
+class ZobristKeys:
+    # Claves fijas (semilla constante) para que el hash sea el mismo entre ejecuciones.
+    # Dependen solo del número de casillas; el tablero de 8x8 conserva sus claves.
+    def __init__(self, size):
+        rng = random.Random(0x5EED)
+
+        def random_keys(n):
+            return [rng.getrandbits(64) for _ in range(n)]
+
+        self.destroyed = random_keys(size)
+        self.horse = (random_keys(size), random_keys(size))
+        self.items = [random_keys(size) for _ in TIER_VALUES]
+        self.turn = rng.getrandbits(64)
+        self.salt = (rng.getrandbits(64), rng.getrandbits(64))
+
+    def score(self, side, score):
+        # splitmix64 del puntaje: los puntajes no están acotados (penalizaciones),
+        # así que la clave se deriva en lugar de salir de una tabla
+        x = (score + self.salt[side]) & MASK64
+        x = (x + 0x9E3779B97F4A7C15) & MASK64
+        x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+        return x ^ (x >> 31)
+
+
+_zobrist_keys = {}
+
+
+def zobrist_keys(size):
+    keys = _zobrist_keys.get(size)
+    if keys is None:
+        keys = _zobrist_keys[size] = ZobristKeys(size)
+    return keys
+
+
+def _restore(destroyed, tiers, white, black, white_score, black_score, turn, zobrist, rows=ROWS, cols=COLS):
+    state = BoardState.__new__(BoardState)
+    state.geo = geometry(rows, cols)
+    state.keys = zobrist_keys(state.geo.size)
+    state.destroyed = destroyed
+    state.tiers = list(tiers)
+    state.items = 0
+    for mask in tiers:
+        state.items |= mask
+    state.white = white
+    state.black = black
+    state.white_score = white_score
+    state.black_score = black_score
+    state.turn = turn
+    state.zobrist = zobrist
+    state.update_mobility()
+    return state
+
+
+class BoardState:
+    __slots__ = ('destroyed', 'tiers', 'items', 'white', 'black',
+                 'white_score', 'black_score', 'turn', 'zobrist',
+                 'white_mobility', 'black_mobility', 'geo', 'keys')
+
+    def __init__(self, destroyed, tiers, white, black, white_score=0, black_score=0, turn=WHITE,
+                 geo=DEFAULT_GEOMETRY):
+        # Tamaño del tablero (tablas de movimientos) y sus claves Zobrist
+        self.geo = geo
+        self.keys = zobrist_keys(geo.size)
+        self.destroyed = destroyed
+        # Una máscara por cada valor de TIER_VALUES
+        self.tiers = list(tiers)
+        self.items = 0
+        for mask in self.tiers:
+            self.items |= mask
+        self.white = white
+        self.black = black
+        self.white_score = white_score
+        self.black_score = black_score
+        self.turn = turn
+        self.zobrist = self.compute_zobrist()
+        # Movimientos disponibles de cada caballo; make_move/unmake_move los
+        # mantienen al día para que evaluar una hoja sea O(1)
+        self.update_mobility()
+
+    # CONVERSIONES
+    @classmethod
+    def from_game(cls, game):
+        geo = game.geo
+        destroyed = 0
+        tiers = [0] * len(TIER_VALUES)
+
+        for r in range(geo.rows):
+            for c in range(geo.cols):
+                piece = game.board[r][c]
+                bit = 1 << geo.square(r, c)
+                if piece == DESTROYED:
+                    destroyed |= bit
+                elif piece in TIER_VALUES:
+                    tiers[TIER_VALUES.index(piece)] |= bit
+
+        turn = WHITE if game.turn == game.white_horse else BLACK
+        return cls(destroyed, tiers,
+                   geo.square(*game.white_horse.get_position()),
+                   geo.square(*game.black_horse.get_position()),
+                   game.white_horse.score, game.black_horse.score, turn, geo)
+
+    def to_board(self):
+        geo = self.geo
+        board = [[0 for _ in range(geo.cols)] for _ in range(geo.rows)]
+        for r in range(geo.rows):
+            for c in range(geo.cols):
+                sq = geo.square(r, c)
+                if self.destroyed >> sq & 1:
+                    board[r][c] = DESTROYED
+                elif self.items >> sq & 1:
+                    board[r][c] = self.value_at(sq)
+        board[self.white // geo.cols][self.white % geo.cols] = 'WH'
+        board[self.black // geo.cols][self.black % geo.cols] = 'BH'
+        return board
+
+    def apply_to(self, game):
+        # Vuelca el estado compacto sobre un Game para que la GUI lo pueda dibujar
+        game.board = self.to_board()
+        game.white_horse.set_position(*self.geo.row_col(self.white))
+        game.black_horse.set_position(*self.geo.row_col(self.black))
+        game.white_horse.score = self.white_score
+        game.black_horse.score = self.black_score
+        game.turn = game.white_horse if self.turn == WHITE else game.black_horse
+
+    # COPIA Y HASH
+    def copy(self):
+        new = BoardState.__new__(BoardState)
+        new.geo = self.geo
+        new.keys = self.keys
+        new.destroyed = self.destroyed
+        new.tiers = self.tiers[:]
+        new.items = self.items
+        new.white = self.white
+        new.black = self.black
+        new.white_score = self.white_score
+        new.black_score = self.black_score
+        new.turn = self.turn
+        new.zobrist = self.zobrist
+        new.white_mobility = self.white_mobility
+        new.black_mobility = self.black_mobility
+        return new
+
+    def __reduce__(self):
+        # Serialización compacta para enviar el estado a otros procesos
+        return (_restore, (self.destroyed, tuple(self.tiers), self.white, self.black,
+                           self.white_score, self.black_score, self.turn, self.zobrist,
+                           self.geo.rows, self.geo.cols))
+
+    def compute_zobrist(self):
+        # Hash completo; make_move/unmake_move lo mantienen de forma incremental
+        keys = self.keys
+        h = keys.horse[WHITE][self.white] ^ keys.horse[BLACK][self.black]
+        h ^= keys.score(WHITE, self.white_score) ^ keys.score(BLACK, self.black_score)
+        if self.turn == BLACK:
+            h ^= keys.turn
+        for sq in squares_of(self.destroyed):
+            h ^= keys.destroyed[sq]
+        for i, mask in enumerate(self.tiers):
+            for sq in squares_of(mask):
+                h ^= keys.items[i][sq]
+        return h
+
+    def key(self):
+        return (self.destroyed, tuple(self.tiers), self.white, self.black,
+                self.white_score, self.black_score, self.turn)
+
+    def __eq__(self, other):
+        return isinstance(other, BoardState) and self.key() == other.key()
+
+    def __hash__(self):
+        return self.zobrist
+
+    def __repr__(self):
+        return (f"BoardState(white={self.geo.row_col(self.white)}, black={self.geo.row_col(self.black)}, "
+                f"scores={self.white_score}/{self.black_score}, turn={'WH' if self.turn == WHITE else 'BH'})")
+
+    # CONSULTAS
+    def value_at(self, sq):
+        bit = 1 << sq
+        if self.items & bit:
+            for value, mask in zip(TIER_VALUES, self.tiers):
+                if mask & bit:
+                    return value
+        return 0
+
+    def update_mobility(self):
+        blocked = self.blocked()
+        self.white_mobility = self.geo.count_moves(self.white, blocked)
+        self.black_mobility = self.geo.count_moves(self.black, blocked)
+
+    def blocked(self):
+        return self.destroyed | (1 << self.white) | (1 << self.black)
+
+    def moves_mask(self, side):
+        sq = self.white if side == WHITE else self.black
+        return self.geo.legal_moves_mask(sq, self.blocked())
+
+    def legal_moves(self, side):
+        # Casillas destino en el mismo orden que los offsets de Game.get_valid_moves
+        return squares_of(self.moves_mask(side))
+
+    # MOVIMIENTOS EN SITIO
+    def make_move(self, move):
+        # Aplica el movimiento del caballo en turno y devuelve el token para deshacerlo
+        side = self.turn
+        self.turn = side ^ 1
+        keys = self.keys
+        previous = self.zobrist
+        h = previous ^ keys.turn
+        mobility = (self.white_mobility, self.black_mobility)
+
+        if move == PASS:
+            if side == WHITE:
+                h ^= keys.score(WHITE, self.white_score)
+                self.white_score -= PASS_PENALTY
+                h ^= keys.score(WHITE, self.white_score)
+            else:
+                h ^= keys.score(BLACK, self.black_score)
+                self.black_score -= PASS_PENALTY
+                h ^= keys.score(BLACK, self.black_score)
+            self.zobrist = h
+            return (PASS, -1, -1, previous, mobility)
+
+        bit = 1 << move
+        tier = -1
+        gain = 0
+        if self.items & bit:
+            self.items ^= bit
+            for i, mask in enumerate(self.tiers):
+                if mask & bit:
+                    self.tiers[i] = mask ^ bit
+                    tier = i
+                    gain = TIER_VALUES[i]
+                    h ^= keys.items[i][move]
+                    break
+
+        if side == WHITE:
+            origin = self.white
+            self.white = move
+            if gain:
+                h ^= keys.score(WHITE, self.white_score)
+                self.white_score += gain
+                h ^= keys.score(WHITE, self.white_score)
+        else:
+            origin = self.black
+            self.black = move
+            if gain:
+                h ^= keys.score(BLACK, self.black_score)
+                self.black_score += gain
+                h ^= keys.score(BLACK, self.black_score)
+
+        horse_keys = keys.horse[side]
+        self.zobrist = h ^ horse_keys[origin] ^ horse_keys[move] ^ keys.destroyed[origin]
+        self.destroyed |= 1 << origin
+
+        # Movilidad: el origen ya estaba bloqueado (ocupado), solo se bloquea el destino.
+        # El caballo que movió recalcula sus salidas; el rival pierde una si el destino era suya.
+        blocked = self.destroyed | (1 << self.white) | (1 << self.black)
+        masks = self.geo.masks
+        if side == WHITE:
+            self.white_mobility = (masks[move] & ~blocked).bit_count()
+            if masks[self.black] & bit:
+                self.black_mobility -= 1
+        else:
+            self.black_mobility = (masks[move] & ~blocked).bit_count()
+            if masks[self.white] & bit:
+                self.white_mobility -= 1
+        return (move, origin, tier, previous, mobility)
+
+    def pass_turn(self):
+        # Paso con las reglas de la partida real: solo cambia el turno (la
+        # penalización única la cobra charge_penalties), sin token para deshacer
+        self.turn ^= 1
+        self.zobrist ^= self.keys.turn
+
+    def unmake_move(self, token):
+        move, origin, tier, previous, mobility = token
+        side = self.turn ^ 1
+        self.turn = side
+        self.zobrist = previous
+        self.white_mobility, self.black_mobility = mobility
+
+        if move == PASS:
+            if side == WHITE:
+                self.white_score += PASS_PENALTY
+            else:
+                self.black_score += PASS_PENALTY
+            return
+
+        gain = 0
+        if tier >= 0:
+            bit = 1 << move
+            self.tiers[tier] |= bit
+            self.items |= bit
+            gain = TIER_VALUES[tier]
+
+        self.destroyed ^= 1 << origin
+        if side == WHITE:
+            self.white = origin
+            self.white_score -= gain
+        else:
+            self.black = origin
+            self.black_score -= gain
+
+
+def charge_penalties(state, penalized):
+    # Igual que Game.game_over tras cada jugada: si la partida sigue, -4 una sola
+    # vez al caballo sin movimientos. penalized es [blanco, negro] y se actualiza
+    if state.white_mobility == 0 and state.black_mobility == 0:
+        return
+    keys = state.keys
+    if state.white_mobility == 0 and not penalized[WHITE]:
+        penalized[WHITE] = True
+        state.zobrist ^= keys.score(WHITE, state.white_score)
+        state.white_score -= PASS_PENALTY
+        state.zobrist ^= keys.score(WHITE, state.white_score)
+    if state.black_mobility == 0 and not penalized[BLACK]:
+        penalized[BLACK] = True
+        state.zobrist ^= keys.score(BLACK, state.black_score)
+        state.black_score -= PASS_PENALTY
+        state.zobrist ^= keys.score(BLACK, state.black_score)
+
+
+def check_make_unmake(games=200, seed=0, rows=ROWS, cols=COLS):
+    # Prueba de consistencia: juega partidas aleatorias con make_move y comprueba
+    # que el tablero coincide con Game.move y que unmake_move lo restaura exactamente
+    from game import Game
+
+    rng = random.Random(seed)
+    for _ in range(games):
+        game = Game(seed=rng.getrandbits(32), rows=rows, cols=cols)
+        state = BoardState.from_game(game)
+        history = []
+
+        while True:
+            moves = state.legal_moves(state.turn)
+            if not moves and not state.legal_moves(state.turn ^ 1):
+                break
+            move = rng.choice(moves) if moves else PASS
+
+            before = state.key()
+            token = state.make_move(move)
+            history.append((before, token))
+            assert state.zobrist == state.compute_zobrist(), "hash Zobrist incremental incorrecto"
+            assert (state.white_mobility, state.black_mobility) == (
+                len(state.legal_moves(WHITE)), len(state.legal_moves(BLACK))), "movilidad incremental incorrecta"
+
+            if move == PASS:
+                game.pass_turn()
+            else:
+                game.move(game.geo.row_col(move))
+            assert state.to_board() == game.board, "make_move no coincide con Game.move"
+
+        while history:
+            before, token = history.pop()
+            state.unmake_move(token)
+            assert state.key() == before, "unmake_move no restaura el estado"
+            assert state.zobrist == state.compute_zobrist(), "unmake_move no restaura el hash"
+
+    return True
+
+
+if __name__ == "__main__":
+    check_make_unmake()
+    check_make_unmake(games=20, rows=12, cols=12)
+    check_make_unmake(games=5, rows=16, cols=10)
+    print("make_move/unmake_move OK")
@@ -0,0 +1,87 @@
+import logging
+
+# Estadísticas de una búsqueda de la IA. Se recogen solo si el Game se crea
+# con collect_stats=True; desactivadas no cuestan más que una comprobación por nodo.
+
+logger = logging.getLogger('smart_horses.search')
+
+
+class SearchStats:
+    def __init__(self):
+        # Nodos visitados por ply (distancia a la raíz)
+        self.nodes_per_ply = []
+        self.leaf_evals = 0
+        self.passes = 0
+        self.cutoffs = 0
+        self.tt_cutoffs = 0
+        # Una entrada por iteración completada: (profundidad, ms acumulados, nodos acumulados)
+        self.iterations = []
+        # Contadores de la tabla de transposiciones durante esta búsqueda
+        self.tt = {}
+        self.elapsed_ms = 0.0
+        self.depth = 0
+        # True si la jugada la decidió el solucionador exacto de finales
+        self.endgame = False
+        # Motor MCTS: partidas simuladas y visitas heredadas del árbol anterior.
+        # nodes_per_ply cuenta entonces las hojas por profundidad.
+        self.rollouts = 0
+        self.reused = 0
+
+    def visit(self, ply):
+        # Las hojas de MCTS pueden llegar a cualquier profundidad
+        while ply >= len(self.nodes_per_ply):
+            self.nodes_per_ply.append(0)
+        self.nodes_per_ply[ply] += 1
+
+    @property
+    def nodes(self):
+        return sum(self.nodes_per_ply)
+
+    def branching_factor(self):
+        # Factor de ramificación efectivo: media geométrica de la razón de
+        # nodos entre plies consecutivos
+        ratios = [b / a for a, b in zip(self.nodes_per_ply, self.nodes_per_ply[1:]) if a and b]
+        if not ratios:
+            return 0.0
+        product = 1.0
+        for ratio in ratios:
+            product *= ratio
+        return product ** (1 / len(ratios))
+
+    def rollouts_per_second(self):
+        return self.rollouts * 1000 / self.elapsed_ms if self.elapsed_ms else 0.0
+
+    def as_dict(self):
+        return {
+            'depth': self.depth,
+            'nodes': self.nodes,
+            'nodes_per_ply': list(self.nodes_per_ply),
+            'leaf_evals': self.leaf_evals,
+            'passes': self.passes,
+            'cutoffs': self.cutoffs,
+            'tt_cutoffs': self.tt_cutoffs,
+            'branching_factor': round(self.branching_factor(), 3),
+            'iterations': [{'depth': d, 'ms': round(ms, 3), 'nodes': n} for d, ms, n in self.iterations],
+            'tt': dict(self.tt),
+            'elapsed_ms': round(self.elapsed_ms, 3),
+            'endgame': self.endgame,
+            'rollouts': self.rollouts,
+            'rollouts_per_s': round(self.rollouts_per_second(), 1),
+            'reused': self.reused,
+        }
+
+    def summary(self):
+        hits = self.tt.get('hits', 0)
+        probes = hits + self.tt.get('misses', 0)
+        hit_rate = hits / probes if probes else 0.0
+        if self.endgame:
+            return f"exact endgame solve, nodes {self.nodes} time {self.elapsed_ms:.1f} ms"
+        if self.rollouts:
+            return (f"mcts depth {self.depth} rollouts {self.rollouts} ({self.rollouts_per_second():.0f}/s) "
+                    f"reused {self.reused} time {self.elapsed_ms:.1f} ms")
+        return (f"depth {self.depth} nodes {self.nodes} leaves {self.leaf_evals} "
+                f"passes {self.passes} cutoffs {self.cutoffs} ebf {self.branching_factor():.2f} "
+                f"tt {hit_rate:.0%} time {self.elapsed_ms:.1f} ms")
+
+    def log(self):
+        logger.info(self.summary())
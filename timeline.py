@@ -0,0 +1,54 @@
+import time
+
+# Línea de tiempo de la GUI: acciones diferidas (fases "pensando", "resaltar
+# objetivo", "saltar turno") que se ejecutan dentro del bucle de eventos en
+# lugar de bloquearlo con pygame.time.wait. El bucle espera eventos como
+# máximo timeout() milisegundos y luego llama a run_due().
+# Con duración 0 la acción corre en la siguiente vuelta del bucle, después de
+# dibujar el fotograma actual (modo turbo).
+
+
+class Timeline:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        # Acciones pendientes en orden de llegada: [vence, nombre, acción]
+        self.entries = []
+
+    def schedule(self, name, delay_ms, action):
+        # Una acción por nombre: programar de nuevo reemplaza la anterior
+        self.cancel(name)
+        self.entries.append([self.clock() + delay_ms / 1000, name, action])
+        self.entries.sort(key=lambda entry: entry[0])
+
+    def cancel(self, name):
+        self.entries = [entry for entry in self.entries if entry[1] != name]
+
+    def fast_forward(self):
+        # Todas las acciones pendientes vencen ya (p. ej. al activar el modo turbo)
+        now = self.clock()
+        for entry in self.entries:
+            entry[0] = min(entry[0], now)
+
+    def clear(self):
+        self.entries = []
+
+    def pending(self, name=None):
+        return any(name is None or entry[1] == name for entry in self.entries)
+
+    def timeout(self):
+        # Milisegundos hasta la próxima acción (0 si ya venció), o None si no hay
+        if not self.entries:
+            return None
+        return max(0, int((self.entries[0][0] - self.clock()) * 1000 + 0.999))
+
+    def run_due(self):
+        # Ejecuta las acciones vencidas; las que éstas programen esperan a la
+        # siguiente llamada, así cada fase dura al menos un fotograma
+        now = self.clock()
+        due = [entry for entry in self.entries if entry[0] <= now]
+        if not due:
+            return 0
+        self.entries = [entry for entry in self.entries if entry[0] > now]
+        for _, _, action in due:
+            action()
+        return len(due)
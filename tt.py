@@ -0,0 +1,81 @@
+# Tabla de transposiciones indexada por el hash Zobrist de BoardState.
+# Cada cubeta tiene dos entradas: una que prefiere profundidad y otra que
+# siempre se reemplaza. Las entradas son tuplas:
+# (clave, profundidad, tipo de cota, valor, mejor movimiento, generación)
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Tamaño aproximado de una entrada en memoria (tupla + enteros + float)
+ENTRY_BYTES = 160
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class TranspositionTable:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        # Número de cubetas: la mayor potencia de dos que cabe en max_bytes
+        buckets = max(1, max_bytes // (2 * ENTRY_BYTES))
+        self.size = 1 << (buckets.bit_length() - 1)
+        self.mask = self.size - 1
+        self.max_bytes = max_bytes
+        self.clear()
+
+    def clear(self):
+        self.deep = [None] * self.size
+        self.recent = [None] * self.size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def new_search(self):
+        # Las entradas de búsquedas anteriores pierden la prioridad por profundidad
+        self.generation += 1
+
+    def probe(self, key):
+        index = key & self.mask
+        entry = self.deep[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        other = self.recent[index]
+        if other is not None and other[0] == key:
+            self.hits += 1
+            return other
+        if entry is not None or other is not None:
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    def peek(self, key):
+        # Consulta sin actualizar los contadores (p. ej. para reconstruir la variación principal)
+        index = key & self.mask
+        for entry in (self.deep[index], self.recent[index]):
+            if entry is not None and entry[0] == key:
+                return entry
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        index = key & self.mask
+        entry = (key, depth, flag, value, move, self.generation)
+        self.stores += 1
+
+        current = self.deep[index]
+        if (current is None or current[0] == key or depth >= current[1]
+                or current[5] != self.generation):
+            self.deep[index] = entry
+        else:
+            self.recent[index] = entry
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'hit_rate': self.hits / probes if probes else 0.0,
+            'buckets': self.size,
+        }
@@ -0,0 +1,253 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from simulate import parse_engine, play_game
+from weights import DEFAULT_WEIGHTS, make_weights, load_weights, save_weights
+
+# Ajuste de los pesos de Game.evaluate_board con SPSA (aproximación
+# estocástica por perturbación simultánea). En la iteración k todos los pesos
+# se perturban a la vez, theta + c_k·delta y theta - c_k·delta con delta
+# aleatorio de ±1, y las dos versiones se enfrentan en partidas pareadas: cada
+# tablero (semilla de _init_board) se juega dos veces cambiando los colores,
+# así la ventaja del tablero se cancela. Con el resultado r (puntos de theta+
+# menos los de theta-, por partida, entre -1 y 1) como diferencia de las dos
+# mediciones, la estimación del gradiente de SPSA mueve cada peso
+#
+#   theta_i += a_k · r / (2 · c_k,i) · delta_i
+#
+# Las partidas de una iteración se reparten en un pool de procesos. Tras cada
+# iteración se escriben el checkpoint (para continuar con --resume) y el
+# archivo de pesos, que Game carga con Game(weights=ruta).
+#
+#   python tune.py --iterations 200 --pairs 32 --engine minimax:3 --out tuned.json
+#   python tune.py --iterations 400 --resume
+#   python simulate.py --games 500 --swap --white minimax:3@tuned.json --black minimax:3
+
+# Pesos que se ajustan: (perturbación c, mínimo, máximo). El de la diferencia
+# de puntaje queda fijo porque solo fija la escala: el minimax elige la misma
+# jugada si todos los pesos se multiplican por una constante.
+SPSA_PARAMS = {
+    'mobility': (0.15, 0.0, 4.0),
+}
+# Exponentes de las ganancias a_k = rate / (k + 1 + stability)^ALPHA y
+# c_k = c / (k + 1)^GAMMA (los recomendados por Spall)
+ALPHA = 0.602
+GAMMA = 0.101
+DEFAULT_RATE = 0.1
+# La versión 1 usaba otra regla de actualización: sus checkpoints no se continúan
+CHECKPOINT_VERSION = 2
+
+
+class SPSA:
+    def __init__(self, theta, params=SPSA_PARAMS, rate=DEFAULT_RATE, stability=0.0, seed=0):
+        self.theta = make_weights(theta)
+        self.params = params
+        self.rate = rate
+        self.stability = stability
+        self.seed = seed
+
+    def perturbation(self, k):
+        # delta depende solo de la semilla y la iteración: al continuar desde
+        # un checkpoint se repiten exactamente las mismas perturbaciones
+        rng = random.Random(f"spsa-{self.seed}-{k}")
+        return {name: rng.choice((-1, 1)) for name in self.params}
+
+    def candidates(self, k):
+        # (theta+, theta-, delta) de la iteración k
+        delta = self.perturbation(k)
+        plus = dict(self.theta)
+        minus = dict(self.theta)
+        for name, (c, low, high) in self.params.items():
+            step = c / (k + 1) ** GAMMA * delta[name]
+            plus[name] = min(high, max(low, self.theta[name] + step))
+            minus[name] = min(high, max(low, self.theta[name] - step))
+        return plus, minus, delta
+
+    def update(self, k, delta, result):
+        a_k = self.rate / (k + 1 + self.stability) ** ALPHA
+        for name, (c, low, high) in self.params.items():
+            c_k = c / (k + 1) ** GAMMA
+            value = self.theta[name] + a_k * result / (2 * c_k) * delta[name]
+            self.theta[name] = min(high, max(low, value))
+        return self.theta
+
+
+def play_paired_game(seed, plus_white, engine, plus, minus):
+    # Puntos de theta+ en el tablero seed: victoria 1, empate 0.5, derrota 0
+    white, black = (plus, minus) if plus_white else (minus, plus)
+    result = play_game(0, seed, engine, engine, white_weights=white, black_weights=black)
+    margin = result['white_score'] - result['black_score']
+    if not plus_white:
+        margin = -margin
+    return 1.0 if margin > 0 else 0.0 if margin < 0 else 0.5
+
+
+def board_seeds(seed, k, pairs):
+    # Tableros nuevos en cada iteración
+    return range(seed + k * pairs, seed + (k + 1) * pairs)
+
+
+def run_iteration(pool, spsa, k, engine, pairs):
+    plus, minus, delta = spsa.candidates(k)
+    futures = [pool.submit(play_paired_game, board_seed, plus_white, engine, plus, minus)
+               for board_seed in board_seeds(spsa.seed, k, pairs)
+               for plus_white in (True, False)]
+    points = [future.result() for future in futures]
+    games = len(points)
+    # Puntos de theta+ menos los de theta-, por partida
+    result = (2 * sum(points) - games) / games
+    spsa.update(k, delta, result)
+    return {
+        'iteration': k + 1,
+        'result': result,
+        'plus': sum(1 for p in points if p == 1.0),
+        'draws': sum(1 for p in points if p == 0.5),
+        'minus': sum(1 for p in points if p == 0.0),
+        'games': games,
+    }
+
+
+def new_checkpoint(config, theta):
+    return {'version': CHECKPOINT_VERSION, 'config': config, 'iteration': 0,
+            'theta': make_weights(theta), 'games': 0, 'elapsed_s': 0.0, 'history': []}
+
+
+def load_checkpoint(path):
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"{path}: unsupported checkpoint version {checkpoint.get('version')!r}")
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(checkpoint, f, indent=1)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+def games_per_hour(games, seconds):
+    return games * 3600 / seconds if seconds else 0.0
+
+
+def format_weights(theta):
+    return ' '.join(f"{name} {theta[name]:.4f}" for name in SPSA_PARAMS)
+
+
+def tune(checkpoint, iterations, workers, checkpoint_path, out, log=print):
+    # Continúa checkpoint hasta completar iterations; lo guarda tras cada iteración
+    config = checkpoint['config']
+    params = {name: tuple(spec) for name, spec in config['params'].items()}
+    spsa = SPSA(checkpoint['theta'], params, config['rate'], config['stability'], config['seed'])
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for k in range(checkpoint['iteration'], iterations):
+            start = time.perf_counter()
+            entry = run_iteration(pool, spsa, k, config['engine'], config['pairs'])
+            seconds = time.perf_counter() - start
+
+            entry['seconds'] = round(seconds, 3)
+            entry['theta'] = dict(spsa.theta)
+            checkpoint['iteration'] = k + 1
+            checkpoint['theta'] = dict(spsa.theta)
+            checkpoint['games'] += entry['games']
+            checkpoint['elapsed_s'] = round(checkpoint['elapsed_s'] + seconds, 3)
+            checkpoint['history'].append(entry)
+            save_checkpoint(checkpoint_path, checkpoint)
+            save_weights(out, spsa.theta)
+
+            log(f"iter {k + 1:>4}/{iterations}  {format_weights(spsa.theta)}  "
+                f"result {entry['result']:+.3f} (+{entry['plus']} ={entry['draws']} -{entry['minus']})  "
+                f"{games_per_hour(entry['games'], seconds):,.0f} games/h")
+
+    log(f"{checkpoint['games']} games in {checkpoint['elapsed_s']:.1f} s "
+        f"({games_per_hour(checkpoint['games'], checkpoint['elapsed_s']):,.0f} games/h, {workers} workers)")
+    log(f"weights: {format_weights(checkpoint['theta'])} -> {out}")
+    return checkpoint
+
+
+def check_tune(iterations=3, pairs=2, engine='minimax:1'):
+    # Continuar desde un checkpoint da los mismos pesos que una sola ejecución,
+    # y el archivo resultante se carga en Game
+    from game import Game
+    from state import BoardState
+
+    config = {'engine': engine, 'pairs': pairs, 'seed': 0, 'rate': DEFAULT_RATE,
+              'stability': 0.0, 'params': SPSA_PARAMS}
+    directory = tempfile.mkdtemp()
+    try:
+        paths = [os.path.join(directory, name) for name in ('a.json', 'a.w', 'b.json', 'b.w')]
+        quiet = lambda line: None
+        whole = tune(new_checkpoint(config, DEFAULT_WEIGHTS), iterations, 1, paths[0], paths[1], quiet)
+        tune(new_checkpoint(config, DEFAULT_WEIGHTS), iterations - 1, 1, paths[2], paths[3], quiet)
+        resumed = tune(load_checkpoint(paths[2]), iterations, 1, paths[2], paths[3], quiet)
+        assert resumed['theta'] == whole['theta'], "el checkpoint no reproduce la ejecución completa"
+        assert [e['result'] for e in resumed['history']] == [e['result'] for e in whole['history']]
+
+        tuned = Game(weights=paths[3])
+        assert tuned.weights == whole['theta'], "Game no carga el archivo de pesos"
+        state = BoardState.from_game(Game(seed=1))
+        expected = ((state.white_score - state.black_score) * tuned.weights['score']
+                    + (state.white_mobility - state.black_mobility) * tuned.weights['mobility'])
+        assert tuned.evaluate_board(state) == expected
+    finally:
+        shutil.rmtree(directory)
+    return whole['theta']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SPSA tuning of the Smart Horses evaluation weights")
+    parser.add_argument('--iterations', type=int, default=100, help="total SPSA iterations")
+    parser.add_argument('--pairs', type=int, default=32, help="boards per iteration, each played with both colours")
+    parser.add_argument('--engine', default='minimax:3', help="search of both sides (minimax:D or time:MS)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first board and of the perturbations")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="SPSA step size a")
+    parser.add_argument('--stability', type=float, help="SPSA stability constant A (default: 10%% of the iterations)")
+    parser.add_argument('--start', help="initial weights file (default: the built-in weights)")
+    parser.add_argument('--checkpoint', default='tune_checkpoint.json', help="checkpoint file")
+    parser.add_argument('--resume', action='store_true', help="continue from the checkpoint (keeps its engine, pairs and gains)")
+    parser.add_argument('--out', default='tuned_weights.json', help="tuned weights file for Game(weights=...)")
+    parser.add_argument('--check', action='store_true', help="run the self-check and exit")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        print(f"tune OK ({format_weights(check_tune())})")
+        return 0
+
+    if args.resume:
+        try:
+            checkpoint = load_checkpoint(args.checkpoint)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        print(f"resuming at iteration {checkpoint['iteration']}: {format_weights(checkpoint['theta'])}")
+    else:
+        if os.path.exists(args.checkpoint):
+            parser.error(f"{args.checkpoint} exists: use --resume to continue it or choose another --checkpoint")
+        try:
+            kind, _, weights_path = parse_engine(args.engine)
+            if kind not in ('minimax', 'time') or weights_path:
+                raise ValueError(f"tuning needs a minimax:D or time:MS engine, not {args.engine!r}")
+            theta = load_weights(args.start) if args.start else DEFAULT_WEIGHTS
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        stability = args.stability if args.stability is not None else 0.1 * args.iterations
+        config = {'engine': args.engine, 'pairs': args.pairs, 'seed': args.seed, 'rate': args.rate,
+                  'stability': stability, 'params': SPSA_PARAMS}
+        checkpoint = new_checkpoint(config, theta)
+
+    tune(checkpoint, args.iterations, args.workers, args.checkpoint, args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import json
+import os
+
+# Pesos de la función heurística (Game.evaluate_board). Los valores por
+# defecto reproducen la evaluación original: diferencia de puntaje más la
+# diferencia de movilidad a mitad de peso. Un archivo de pesos es un objeto
+# JSON con algunos de estos nombres (los que falten toman el valor por defecto):
+#
+#   {"score": 1.0, "mobility": 0.62}
+#
+# tune.py los ajusta con SPSA y escribe el archivo; Game(weights=ruta) lo carga.
+
+DEFAULT_WEIGHTS = {
+    'score': 1.0,     # diferencia de puntaje (fija la escala de la evaluación)
+    'mobility': 0.5,  # diferencia de movimientos disponibles
+}
+
+
+def make_weights(weights=None):
+    # Completa un diccionario de pesos con los valores por defecto
+    merged = dict(DEFAULT_WEIGHTS)
+    if weights:
+        unknown = sorted(set(weights) - set(DEFAULT_WEIGHTS))
+        if unknown:
+            raise ValueError(f"unknown evaluation weights: {', '.join(unknown)} "
+                             f"(known: {', '.join(DEFAULT_WEIGHTS)})")
+        merged.update((name, float(value)) for name, value in weights.items())
+    return merged
+
+
+def load_weights(path):
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: a weights file must hold a JSON object")
+    return make_weights(data)
+
+
+def save_weights(path, weights):
+    # Escritura atómica: un archivo a medio escribir nunca reemplaza al anterior
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(make_weights(weights), f, indent=2)
+        f.write('\n')
+    os.replace(tmp, path)
@@ -0,0 +1,127 @@
+import logging
+import queue
+import threading
+
+from game import SearchTimeout
+from state import BLACK
+
+# Resultado aún no disponible (el movimiento puede ser None si la IA no tiene jugadas)
+PENDING = object()
+# Resultado de una búsqueda que falló con una excepción (queda en el registro)
+FAILED = object()
+
+logger = logging.getLogger('smart_horses.worker')
+
+
+class AIWorker(threading.Thread):
+    # Hilo que ejecuta la búsqueda de la IA fuera del bucle de la GUI.
+    # Recibe instantáneas BoardState por una cola y devuelve los movimientos por otra.
+    # Durante el turno del jugador analiza sus respuestas probables (ponder) y
+    # guarda la jugada de la IA para cada una, así la respuesta es inmediata.
+
+    def __init__(self, game, notify=None):
+        super().__init__(daemon=True)
+        # El Game aporta la búsqueda y su tabla de transposiciones; el hilo
+        # solo modifica las tablas de búsqueda, nunca el tablero.
+        self.game = game
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.ponder_cache = {}
+        self.ponder_hits = 0
+        self.last_request = 0
+        # Llamada opcional (desde este hilo) cuando hay una respuesta lista,
+        # p. ej. para despertar el bucle de eventos de la GUI
+        self.notify = notify
+
+    # API PARA LA GUI
+    def submit(self, state):
+        # Pide la jugada para el estado; interrumpe el ponder en curso
+        self.last_request += 1
+        self.game.stop_requested = True
+        self.requests.put(('search', self.last_request, state.copy()))
+        return self.last_request
+
+    def ponder(self, state):
+        self.requests.put(('ponder', None, state.copy()))
+
+    def poll(self, request_id):
+        # Devuelve el movimiento pedido o PENDING; descarta respuestas viejas
+        while True:
+            try:
+                result_id, move = self.results.get_nowait()
+            except queue.Empty:
+                return PENDING
+            if result_id == request_id:
+                return move
+
+    def stop(self):
+        self.game.stop_requested = True
+        self.requests.put(('stop', None, None))
+
+    def _check_requests(self):
+        if self.game.stop_requested or not self.requests.empty():
+            raise SearchTimeout()
+
+    # HILO
+    def run(self):
+        while True:
+            kind, request_id, state = self.requests.get()
+            self.game.stop_requested = False
+
+            if kind == 'stop':
+                return
+
+            if kind == 'search':
+                move = self.ponder_cache.get(state.zobrist, PENDING)
+                if move is PENDING:
+                    try:
+                        move = self.game.search(state)
+                    except SearchTimeout:
+                        # Interrumpida por una petición más nueva
+                        continue
+                    except Exception:
+                        # El hilo sigue vivo y la GUI recibe el fallo en vez de esperar para siempre
+                        logger.exception("AI search failed")
+                        move = FAILED
+                else:
+                    self.ponder_hits += 1
+                self.ponder_cache.clear()
+                self.results.put((request_id, move))
+                if self.notify is not None:
+                    self.notify()
+
+            elif kind == 'ponder':
+                try:
+                    self._ponder(state)
+                except Exception:
+                    # El ponder es opcional: la jugada real se buscará igualmente
+                    logger.exception("AI ponder failed")
+                    self.ponder_cache.clear()
+
+    def _ponder(self, state):
+        if state.turn != BLACK:
+            return
+
+        if self.game.mcts is not None:
+            # MCTS: el árbol de la posición del jugador contiene sus respuestas;
+            # la búsqueda siguiente reutiliza el subárbol de la que juegue
+            try:
+                self.game.mcts.ponder(state, self._check_requests)
+            except SearchTimeout:
+                pass
+            return
+
+        # Respuestas del jugador en orden de probabilidad (valor y movilidad)
+        replies = self.game.order_moves(state, state.legal_moves(BLACK), 0)
+        for reply in replies:
+            if not self.requests.empty():
+                return
+
+            child = state.copy()
+            child.make_move(reply)
+            if child.zobrist in self.ponder_cache:
+                continue
+            try:
+                self.ponder_cache[child.zobrist] = self.game.search(child, ponder=True)
+            except SearchTimeout:
+                return